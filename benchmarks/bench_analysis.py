@@ -0,0 +1,73 @@
+"""Бенчмарк пула анализа: даты из EXIF + частичные хеши на 1..8 процессах.
+
+Корпус синтетический: JPEG-заголовки с EXIF и случайным хвостом, у всех
+файлов размер «совпадает с библиотекой», так что каждый файл хешируется.
+
+    python benchmarks/bench_analysis.py
+    python benchmarks/bench_analysis.py --files 5000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.analysis import AnalysisPool, analyze  # noqa: E402
+from core.file_utils import scan_files  # noqa: E402
+from synthetic import exif_jpeg_header  # noqa: E402
+
+
+def build_corpus(root: Path, count: int, size_kb: int, seed: int = 7):
+    rnd = random.Random(seed)
+    tail = os.urandom(size_kb * 1024)
+    for i in range(count):
+        folder = root / f"d{i % 20}"
+        folder.mkdir(parents=True, exist_ok=True)
+        date = f"{rnd.randint(2005, 2024)}:{rnd.randint(1, 12):02d}:{rnd.randint(1, 28):02d} 10:00:00"
+        with open(folder / f"IMG_{i:06d}.jpg", "wb") as fh:
+            fh.write(exif_jpeg_header(date))
+            fh.write(tail[:size_kb * 1024 - rnd.randint(0, 4096)])
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--files", type=int, default=2000)
+    ap.add_argument("--size-kb", type=int, default=256)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--dir", help="где строить корпус (по умолчанию — временная папка)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        root = Path(tmp)
+        build_corpus(root, args.files, args.size_kb)
+        records = list(scan_files(root))
+        sizes = {rec.size for rec in records}
+        # Прогрев кэша страниц, чтобы первый прогон не мерил диск
+        inline = timed(lambda: [analyze(rec, True, sizes) for rec in records])
+        print(f"{len(records)} files, {os.cpu_count()} CPUs; inline: {len(records) / inline:,.0f} files/s")
+        print(f"{'workers':>7} {'seconds':>8} {'files/s':>9} {'speedup':>8} {'efficiency':>10}")
+        base = None
+        for n in args.workers:
+            pool = AnalysisPool(n, want_date=True, sizes=sizes)
+            try:
+                list(pool.map(records[:n * 8]))   # запуск процессов — вне замера
+                elapsed = timed(lambda: list(pool.map(records)))
+            finally:
+                pool.shutdown()
+            base = base or elapsed * args.workers[0]
+            speedup = base / elapsed
+            print(f"{n:>7} {elapsed:>8.2f} {len(records) / elapsed:>9,.0f} {speedup:>8.2f} {speedup / n:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
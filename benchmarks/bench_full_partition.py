@@ -0,0 +1,56 @@
+"""Регрессионный бенчмарк: маршрутизация _process_full должна расти линейно.
+
+Дерево синтетическое — записи FileRecord в памяти, перемещения заглушены,
+так что меряется только классификация и выбор папки.
+
+    python benchmarks/bench_full_partition.py
+    python benchmarks/bench_full_partition.py --sizes 10000 100000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.engine import Organizer  # noqa: E402
+from synthetic import synthetic_records  # noqa: E402
+
+
+def run_once(count: int) -> float:
+    root = Path("/nonexistent-bench")
+    worker = Organizer("full", str(root / "media"), str(root / "temp"))
+    worker._move = lambda f, folder, index=None: folder / f.name  # без файловой системы
+    files = synthetic_records(root / "temp", count)
+    results = worker._new_results()
+    start = time.perf_counter()
+    worker._process_full(files, results, len(files))
+    elapsed = time.perf_counter() - start
+    assert len(results["moved"]) == count
+    return elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--tolerance", type=float, default=3.0,
+                    help="допустимый рост времени на файл относительно самого малого дерева")
+    args = ap.parse_args()
+
+    baseline = None
+    failed = False
+    print(f"{'files':>10} {'seconds':>9} {'us/file':>9} {'ratio':>6}")
+    for n in sorted(args.sizes):
+        per_file = run_once(n) / n
+        baseline = baseline or per_file
+        ratio = per_file / baseline
+        failed |= ratio > args.tolerance
+        print(f"{n:>10} {per_file * n:>9.2f} {per_file * 1e6:>9.2f} {ratio:>6.2f}")
+    if failed:
+        print("❌ Runtime grows faster than linear")
+        sys.exit(1)
+    print("✅ Linear")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Бенчмарк списка перемещений: list[(Path, Path)] против MoveLedger.
+
+Память (tracemalloc) и время заполнения на N синтетических перемещений,
+затем — фильтр и сортировка ledger, и, если есть PySide6, модель
+таблицы: докрутка до конца порциями fetchMore и отрисовка окна строк
+в случайных местах (сколько стоит data() на экран).
+
+    python benchmarks/bench_ledger.py
+    python benchmarks/bench_ledger.py --files 1000000 --spill-mb 8
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.ledger import MoveLedger, SORT_KEYS  # noqa: E402
+from synthetic import synthetic_records  # noqa: E402
+
+CATEGORIES = ("sorted", "sorted", "sorted", "sorted", "duplicates", "screenshots", "compressed", "other")
+SCREEN_ROWS = 40
+
+
+def moves(count: int, seed: int = 3):
+    """(src, dst, категория, размер) — как их отдаёт Organizer._apply"""
+    rnd = random.Random(seed)
+    media = Path("/nonexistent-bench/media")
+    for rec in synthetic_records(Path("/nonexistent-bench/temp"), count):
+        category = rnd.choice(CATEGORIES)
+        if category == "sorted":
+            folder = media / str(rnd.randint(2005, 2024)) / f"{rnd.randint(1, 12):02d}"
+        else:
+            folder = rec.path.parent.parent / "other" / category
+        name = rec.path.name if rnd.random() > 0.02 else f"{rec.path.stem}(1){rec.suffix}"
+        dst = folder / name
+        str(rec.path), str(dst)   # в движке пути уже побывали в os.rename — строка посчитана
+        yield rec.path, dst, category, rec.size
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def measured(fn):
+    """(результат, секунды, прирост памяти в МБ); память — отдельным прогоном,
+    tracemalloc сильно замедляет выделения"""
+    _, elapsed = timed(fn)
+    tracemalloc.start()
+    out = fn()
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, size / 1048576
+
+
+def bench_model(ledger, rnd):
+    from PySide6.QtCore import QCoreApplication, Qt
+    from ui.results_view import MovesModel
+
+    app = QCoreApplication.instance() or QCoreApplication([])   # noqa: F841
+    model = MovesModel(ledger)
+    start = time.perf_counter()
+    while model.canFetchMore():
+        model.fetchMore()
+    fetched = time.perf_counter() - start
+    screens = 200
+    start = time.perf_counter()
+    for _ in range(screens):
+        top = rnd.randrange(max(1, model.rowCount() - SCREEN_ROWS))
+        for row in range(top, top + SCREEN_ROWS):
+            for column in range(model.columnCount()):
+                model.data(model.index(row, column), Qt.DisplayRole)
+    per_screen = (time.perf_counter() - start) / screens
+    print(f"model: fetchMore to {model.rowCount()} rows {fetched:.3f}s, "
+          f"{SCREEN_ROWS}-row screen {per_screen * 1000:.2f} ms")
+    for column in (0, 4):
+        start = time.perf_counter()
+        model.sort(column, Qt.DescendingOrder)
+        print(f"model: sort by column {column} {time.perf_counter() - start:.3f}s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--files", type=int, default=1_000_000)
+    ap.add_argument("--spill-mb", type=float, default=8, help="порог сброса имён во временный файл")
+    args = ap.parse_args()
+
+    rows = list(moves(args.files))
+
+    def fill_list():
+        # Свои объекты Path на каждое перемещение — как results["moved"] до ledger
+        out = []
+        for src, dst, _category, _size in rows:
+            src, dst = Path(str(src)), Path(str(dst))
+            str(src), str(dst)
+            out.append((src, dst))
+        return out
+
+    tuples, t_list, m_list = measured(fill_list)
+    del tuples
+
+    def fill():
+        ledger = MoveLedger(int(args.spill_mb * 1048576))
+        for src, dst, category, size in rows:
+            ledger.append(src, dst, category, size)
+        return ledger
+
+    ledger, t_ledger, m_ledger = measured(fill)
+    print(f"{'':>8} {'fill, s':>8} {'memory, MB':>11} {'B/row':>6}")
+    print(f"{'list':>8} {'':>8} {m_list:11.1f} {m_list * 1048576 / args.files:6.0f}")
+    print(f"{'ledger':>8} {t_ledger:8.2f} {m_ledger:11.1f} {m_ledger * 1048576 / args.files:6.0f}"
+          f"  (names spilled: {ledger._spilled / 1048576:.1f} MB)")
+
+    rnd = random.Random(1)
+    for i in rnd.sample(range(args.files), 1000):
+        assert ledger[i] == rows[i][:2], "ledger row differs from the move"
+    selected, t_select = timed(lambda: ledger.select("duplicates"))
+    print(f"\nselect duplicates: {len(selected)} rows {t_select:.3f}s")
+    for key in SORT_KEYS:
+        _, elapsed = timed(lambda: ledger.order(range(len(ledger)), key))
+        tracemalloc.start()
+        ledger.order(range(len(ledger)), key)
+        _size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"order by {key:<8} {elapsed:.3f}s  peak {peak / 1048576:.1f} MB")
+
+    try:
+        import PySide6  # noqa: F401
+    except ImportError:
+        print("\nPySide6 not installed — model part skipped")
+        return
+    print()
+    bench_model(ledger, rnd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Бенчмарк правил: скомпилированный RuleSet против цикла по правилам.
+
+Прежний classify (any() по ключевым словам скриншотов) — точка отсчёта;
+дальше наборы из встроенных правил плюс N синтетических. Оба способа
+обязаны выбрать одно и то же правило для каждого файла.
+
+    python benchmarks/bench_rules.py
+    python benchmarks/bench_rules.py --files 500000 --rules 0 10 40
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.file_utils import MEDIA_EXT, SCREENSHOT_KEYWORDS, SMALL_FILE_LIMIT  # noqa: E402
+from core.rules import DEFAULT_RULES, RuleSet  # noqa: E402
+from synthetic import synthetic_records  # noqa: E402
+
+
+def keyword_classify(rec):
+    """Классификация до правил — цикл any() по SCREENSHOT_KEYWORDS"""
+    name = rec.stem.lower()
+    if any(kw in name for kw in SCREENSHOT_KEYWORDS):
+        return "screenshots"
+    if rec.suffix not in MEDIA_EXT:
+        return "other"
+    if rec.size < SMALL_FILE_LIMIT:
+        return "compressed"
+    return None
+
+
+def naive_match(rules, rec):
+    """Каждое правило по очереди — то, что заменяют таблицы и общее выражение"""
+    stem = rec.stem.lower()
+    for rule in rules:
+        if not rule.accepts_ext(rec.suffix) or not rule.accepts_size(rec.size):
+            continue
+        if rule.names and not any(kw in stem for kw in rule.names):
+            continue
+        if rule.check(rec):
+            return rule
+    return None
+
+
+def extra_rules(count: int):
+    """Правдоподобные правила: папки по словам в имени, расширениям, размерам и годам"""
+    exts = sorted(MEDIA_EXT) + ["txt", "pdf", "zip", "doc"]
+    rules = []
+    for i in range(count):
+        spec = {"name": f"rule{i}", "target": f"rules/{i}"}
+        kind = i % 4
+        if kind == 0:
+            spec["names"] = [f"trip{i}", f"album_{i}", f"wa{i:03d}"]
+        elif kind == 1:
+            spec["ext"] = [exts[i % len(exts)]]
+            spec["min_size"] = (i % 7) * 1024 * 1024
+        elif kind == 2:
+            spec["names"] = [f"dsc{i}"]
+            spec["after"] = f"{2000 + i % 20}-01-01"
+        else:
+            spec["regex"] = rf"^x{i}_\d+"
+            spec["max_size"] = (i % 5 + 1) * 512 * 1024
+        rules.append(spec)
+    return rules
+
+
+def timed(fn, files) -> tuple[float, list]:
+    start = time.perf_counter()
+    out = [fn(f) for f in files]
+    return time.perf_counter() - start, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--files", type=int, default=200_000)
+    ap.add_argument("--rules", type=int, nargs="+", default=[0, 12, 48],
+                    help="сколько синтетических правил добавить к встроенным")
+    args = ap.parse_args()
+
+    files = synthetic_records(Path("/nonexistent-bench/temp"), args.files)
+    base, _ = timed(keyword_classify, files)
+    print(f"{'rules':>6} {'loop, s':>9} {'compiled, s':>12} {'vs keywords':>12}")
+    print(f"{'kw':>6} {base:9.3f} {'':>12} {1.0:11.2f}x")
+    for extra in args.rules:
+        rules = RuleSet(DEFAULT_RULES + extra_rules(extra))
+        loop, expected = timed(lambda f: naive_match(rules.rules, f), files)
+        compiled, got = timed(rules.match, files)
+        assert got == expected, "compiled rules disagree with the per-rule loop"
+        print(f"{len(rules.rules):>6} {loop:9.3f} {compiled:12.3f} {compiled / base:11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Сквозной бенчмарк движка на синтетическом дереве: время по фазам и счётчики вызовов.
+
+Каждый прогон получает свежее дерево (перемещения его меняют), строится
+оно вне замера.
+
+    python benchmarks/bench_run.py
+    python benchmarks/bench_run.py --modes full --temp-files 20000 --threads 1 8
+    python benchmarks/bench_run.py --modes full --profile /tmp/full.prof
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.engine import Organizer  # noqa: E402
+from synthetic import add_tree_arguments, build_from_args  # noqa: E402
+
+
+def run_once(root: Path, args, mode: str, threads: int, workers: int):
+    build_from_args(root, args)
+    organizer = Organizer(
+        mode, str(root / "media"), str(root / "temp"),
+        streaming=args.streaming, move_threads=threads, analysis_workers=workers,
+        incremental=False, profile=args.profile,
+    )
+    try:
+        return organizer.run()
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--modes", nargs="+", default=["full", "duplicates", "trash"])
+    ap.add_argument("--threads", type=int, nargs="+", default=[4])
+    ap.add_argument("--workers", type=int, default=1, help="analysis processes")
+    ap.add_argument("--streaming", action="store_true")
+    ap.add_argument("--profile", help="cProfile stats file (last run wins)")
+    ap.add_argument("--dir", help="где строить деревья (по умолчанию — временная папка)")
+    add_tree_arguments(ap)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for mode in args.modes:
+            for threads in args.threads:
+                res = run_once(Path(tmp) / "tree", args, mode, threads, args.workers)
+                print(f"\n== {mode}, {threads} threads: {len(res['moved'])} moved in "
+                      f"{res['elapsed']:.2f}s ({res['throughput']['files_per_s']:,.0f} files/s)")
+                for name, seconds in sorted(res["timings"].items(), key=lambda item: -item[1]):
+                    print(f"  {name:<12} {seconds:>8.3f}s")
+                print("  -- phases (summed over threads)")
+                for name, seconds in sorted(res["phases"].items(), key=lambda item: -item[1]):
+                    print(f"  {name:<12} {seconds:>8.3f}s")
+                print("  -- ops: " + ", ".join(f"{k}={v:,}" for k, v in sorted(res["ops"].items())))
+
+
+if __name__ == "__main__":
+    main()
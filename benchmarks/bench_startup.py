@@ -0,0 +1,111 @@
+"""Бенчмарк запуска GUI: время до первой отрисовки окна и импорт по модулям.
+
+Каждый прогон — отдельный процесс (холодные импорты Python, тёплый
+дисковый кэш): main.create_window(), show(), и время до первого
+QEvent.Paint главного окна. Импорт меряется через python -X importtime.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --top 25
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_startup.py
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Дочерний процесс: t0 — до первого импорта, дальше ровно путь main.py
+CHILD = r"""
+import time
+t0 = time.perf_counter()
+import json, sys
+sys.path.insert(0, sys.argv[1])
+import main
+from PySide6.QtCore import QEvent, QObject, QTimer
+t_import = time.perf_counter()
+app, w = main.create_window([sys.argv[0]])
+t_window = time.perf_counter()
+marks = {}
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and "paint" not in marks:
+            marks["paint"] = time.perf_counter()
+            # Отложенное (тени и т.п.) успевает выполниться до выхода
+            QTimer.singleShot(0, lambda: (marks.setdefault("idle", time.perf_counter()), app.quit()))
+        return False
+
+spy = FirstPaint()
+w.installEventFilter(spy)
+w.show()
+QTimer.singleShot(10000, app.quit)
+app.exec()
+print(json.dumps({
+    "import": t_import - t0, "window": t_window - t_import,
+    "first_paint": marks.get("paint", float("nan")) - t0,
+    "idle": marks.get("idle", float("nan")) - t0,
+}))
+"""
+
+
+def run_once(importtime: bool = False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD, str(ROOT)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode:
+        raise SystemExit(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def parse_importtime(stderr: str):
+    """(модуль, своё время, накопленное, глубина) из вывода -X importtime, в мкс"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative), depth))
+    return rows
+
+
+def group_of(module: str) -> str:
+    top = module.split(".")[0]
+    return top if top in ("PySide6", "shiboken6", "ui", "core", "main") else "stdlib/other"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15, help="сколько самых дорогих импортов показать")
+    args = ap.parse_args()
+
+    runs = [run_once()[0] for _ in range(args.runs)]
+    print(f"{'':>14} {'median, ms':>11} {'min, ms':>9}")
+    for key in ("import", "window", "first_paint", "idle"):
+        values = [r[key] * 1000 for r in runs]
+        print(f"{key:>14} {statistics.median(values):11.1f} {min(values):9.1f}")
+
+    _, stderr = run_once(importtime=True)
+    rows = parse_importtime(stderr)
+    groups = {}
+    for name, self_us, _cumulative, _depth in rows:
+        groups[group_of(name)] = groups.get(group_of(name), 0) + self_us
+    print("\nImport time by package (self), ms:")
+    for group, us in sorted(groups.items(), key=lambda item: -item[1]):
+        print(f"  {group:<14} {us / 1000:8.1f}")
+    print(f"\nTop {args.top} modules by cumulative import time, ms:")
+    for name, self_us, cumulative, depth in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} {self_us / 1000:8.1f}  {'  ' * depth}{name}")
+    loaded = {name for name, *_ in rows}
+    eager = sorted(m for m in loaded if m.startswith("core"))
+    print(f"\ncore modules imported before the first paint: {', '.join(eager) or 'none'}")
+
+
+if __name__ == "__main__":
+    if os.environ.get("QT_QPA_PLATFORM") is None and not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        os.environ["QT_QPA_PLATFORM"] = "offscreen"   # без дисплея — хоть что-то намерить
+    main()
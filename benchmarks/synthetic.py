@@ -0,0 +1,192 @@
+"""Синтетические деревья TEMP/MEDIA для бенчмарков.
+
+Размеры настоящие, но файлы разреженные: пишутся только заголовок и по
+64 KB случайных данных в начале и в конце (ровно то, что читают даты
+и частичные хеши), остальное — дыра. Так дерево на 100k файлов по
+нескольку МБ строится за секунды и почти не занимает диск.
+
+    python benchmarks/synthetic.py /tmp/tree --temp-files 10000 --media-files 5000
+    python benchmarks/synthetic.py /tmp/tree --sizes tiny=0.5,photo=0.5 --names screenshot=1
+"""
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.file_utils import FileRecord, MEDIA_EXT  # noqa: E402
+
+# Диапазоны размеров (байт) — граница 100 KB важна для compressed
+SIZES = {
+    "tiny": (1024, 100 * 1024 - 1),
+    "photo": (1024 * 1024, 8 * 1024 * 1024),
+    "raw": (20 * 1024 * 1024, 40 * 1024 * 1024),
+    "video": (20 * 1024 * 1024, 200 * 1024 * 1024),
+}
+DEFAULT_SIZES = {"tiny": 0.2, "photo": 0.65, "raw": 0.05, "video": 0.1}
+
+# Шаблоны имён: (формат, расширения); {d} — дата съёмки, {i} — номер
+NAMES = {
+    "camera": ("IMG_{d:%Y%m%d}_{i}", (".jpg", ".heic", ".dng")),
+    "video": ("VID_{d:%Y%m%d}_{i}", (".mp4", ".mov")),
+    "dated": ("{d:%Y-%m-%d} {i}", (".jpg", ".png")),
+    "plain": ("DSC{i:05d}", (".jpg", ".nef", ".cr2")),
+    "screenshot": ("Screenshot_{d:%Y%m%d}_{i}", (".png", ".jpg")),
+    "other": ("doc_{i}", (".txt", ".pdf", ".zip")),
+}
+DEFAULT_NAMES = {"camera": 0.45, "video": 0.1, "dated": 0.1, "plain": 0.15,
+                 "screenshot": 0.1, "other": 0.1}
+
+CHUNK = 64 * 1024
+
+
+def parse_weights(text: str, known) -> dict:
+    """'photo=0.6,tiny=0.4' → {'photo': 0.6, 'tiny': 0.4}"""
+    weights = {}
+    for part in text.split(","):
+        name, _, value = part.partition("=")
+        if name not in known:
+            raise argparse.ArgumentTypeError(f"unknown '{name}', expected one of {', '.join(known)}")
+        weights[name] = float(value or 1)
+    return weights
+
+
+def exif_jpeg_header(date: str) -> bytes:
+    """SOI + APP1 с IFD0 → ExifIFD → DateTimeOriginal"""
+    value = date.encode() + b"\x00"
+    ifd0 = struct.pack("<H", 1) + struct.pack("<HHII", 0x8769, 4, 1, 26) + struct.pack("<I", 0)
+    exif = struct.pack("<H", 1) + struct.pack("<HHII", 0x9003, 2, len(value), 44) + struct.pack("<I", 0)
+    tiff = b"II*\x00" + struct.pack("<I", 8) + ifd0 + exif + value
+    payload = b"Exif\x00\x00" + tiff
+    return b"\xff\xd8\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+class TreeSpec:
+    """Параметры дерева; pick() выдаёт (имя, размер, дата) детерминированно по seed"""
+
+    def __init__(self, sizes=None, names=None, exif: float = 0.5, seed: int = 1):
+        self.sizes = sizes or DEFAULT_SIZES
+        self.names = names or DEFAULT_NAMES
+        self.exif = exif
+        self.rnd = random.Random(seed)
+        self.start = datetime(2010, 1, 1)
+
+    def _weighted(self, weights):
+        return self.rnd.choices(list(weights), weights=list(weights.values()))[0]
+
+    def pick(self, i: int):
+        pattern, exts = NAMES[self._weighted(self.names)]
+        dt = self.start + timedelta(seconds=self.rnd.randrange(15 * 365 * 86400))
+        lo, hi = SIZES[self._weighted(self.sizes)]
+        return pattern.format(d=dt, i=i) + self.rnd.choice(exts), self.rnd.randint(lo, hi), dt
+
+
+def write_sparse(path: Path, size: int, header: bytes = b"", body: bytes | None = None):
+    """Заголовок + случайные начало и конец, середина — дыра"""
+    body = body if body is not None else os.urandom(2 * CHUNK)
+    with open(path, "wb") as fh:
+        head = (header + body[:CHUNK])[:size]
+        fh.write(head)
+        if size > len(head):
+            tail = body[CHUNK:][:size - len(head)]
+            fh.seek(size - len(tail))
+            fh.write(tail)
+        fh.truncate(size)
+
+
+def build_tree(root: Path, temp_files: int, media_files: int = 0, spec: TreeSpec | None = None,
+               duplicates: float = 0.0, depth: int = 2, fanout: int = 20) -> dict:
+    """TEMP с вложенными папками и MEDIA по ГГГГ/ММ; duplicates — доля копий из MEDIA"""
+    spec = spec or TreeSpec()
+    temp, media = Path(root) / "temp", Path(root) / "media"
+    temp.mkdir(parents=True, exist_ok=True)
+    media.mkdir(parents=True, exist_ok=True)
+    library = []
+    counts = {"temp": 0, "media": 0, "duplicates": 0, "bytes": 0}
+
+    def header_for(name, dt):
+        if spec.rnd.random() < spec.exif and name.lower().endswith(".jpg"):
+            return exif_jpeg_header(dt.strftime("%Y:%m:%d %H:%M:%S"))
+        return b""
+
+    for i in range(media_files):
+        name, size, dt = spec.pick(i)
+        folder = media / f"{dt.year}" / f"{dt.month:02d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        header, body = header_for(name, dt), os.urandom(2 * CHUNK)
+        write_sparse(folder / name, size, header, body)
+        library.append((name, size, header, body))
+        counts["media"] += 1
+        counts["bytes"] += size
+
+    for i in range(temp_files):
+        parts = [f"d{spec.rnd.randrange(fanout)}" for _ in range(spec.rnd.randint(0, depth))]
+        folder = temp.joinpath(*parts)
+        folder.mkdir(parents=True, exist_ok=True)
+        if library and spec.rnd.random() < duplicates:
+            # Копия библиотечного файла под новым именем — ловится только по содержимому
+            name, size, header, body = spec.rnd.choice(library)
+            stem, ext = os.path.splitext(name)
+            write_sparse(folder / f"{stem}_copy{i}{ext}", size, header, body)
+            counts["duplicates"] += 1
+        else:
+            name, size, dt = spec.pick(media_files + i)
+            write_sparse(folder / name, size, header_for(name, dt))
+        counts["temp"] += 1
+        counts["bytes"] += size
+    return counts
+
+
+def synthetic_records(root: Path, count: int, seed: int = 1):
+    """Записи FileRecord только в памяти — для бенчмарков маршрутизации без диска"""
+    rnd = random.Random(seed)
+    names = ["IMG_{i}", "Screenshot_{i}", "VID_{i}", "doc_{i}", "photo {i}", "snapshot_{i}"]
+    exts = sorted(MEDIA_EXT) + [".txt", ".pdf", ".zip"]
+    now = time.time()
+    files = []
+    for i in range(count):
+        folder = root / f"dir{i % 97}" / f"sub{i % 13}"
+        name = rnd.choice(names).format(i=i) + rnd.choice(exts)
+        size = rnd.choice((40 * 1024, 2 * 1024 * 1024))
+        ts = now - rnd.randrange(0, 10 * 365 * 86400)
+        files.append(FileRecord(folder / name, size, ts, ts, Path(name).suffix.lower()))
+    return files
+
+
+def add_tree_arguments(ap):
+    ap.add_argument("--temp-files", type=int, default=2000)
+    ap.add_argument("--media-files", type=int, default=1000)
+    ap.add_argument("--sizes", type=lambda t: parse_weights(t, SIZES), default=DEFAULT_SIZES,
+                    help=f"weights of {', '.join(SIZES)}")
+    ap.add_argument("--names", type=lambda t: parse_weights(t, NAMES), default=DEFAULT_NAMES,
+                    help=f"weights of {', '.join(NAMES)}")
+    ap.add_argument("--exif", type=float, default=0.5, help="share of JPEGs with EXIF date")
+    ap.add_argument("--duplicates", type=float, default=0.1, help="share of TEMP files copied from MEDIA")
+    ap.add_argument("--depth", type=int, default=2, help="max TEMP folder depth")
+    ap.add_argument("--seed", type=int, default=1)
+
+
+def build_from_args(root: Path, args) -> dict:
+    spec = TreeSpec(args.sizes, args.names, args.exif, args.seed)
+    return build_tree(root, args.temp_files, args.media_files, spec, args.duplicates, args.depth)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("root")
+    add_tree_arguments(ap)
+    args = ap.parse_args()
+    started = time.perf_counter()
+    counts = build_from_args(Path(args.root), args)
+    print(f"✅ {counts['temp']} TEMP files ({counts['duplicates']} copies), "
+          f"{counts['media']} MEDIA files, {counts['bytes'] / 1048576:,.0f} MB apparent "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import NamedTuple
+
+from .file_utils import FileRecord
+from .rules import RuleSet, DEFAULT_RULESET, MEDIA
+from .metadata import resolve_capture_date
+from .dedup import partial_digest
+from .perceptual import PHASH_EXT, dhash
+
+# Файлов в одной задаче для процесса — меньше пачка, больше накладных на IPC
+BATCH_SIZE = 256
+# Сколько пачек держим в работе на один процесс
+BATCHES_PER_WORKER = 2
+
+
+class Analysis(NamedTuple):
+    """Итог анализа файла — всё, что можно посчитать без перемещений"""
+    bucket: str
+    date: datetime | None = None
+    date_source: str | None = None
+    partial: bytes | None = None   # частичный хеш для DuplicateIndex
+    bytes_read: int = 0
+    phash: int | None = None       # dHash для режима похожих фото
+    ops: dict | None = None        # счётчики операций (open, bytes_read) для StatCounter
+
+
+class _Ops:
+    """Счётчики операций одного файла в процессе пула — count() как у StatCounter"""
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts = {}
+
+    def count(self, name: str, n: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+
+# Размеры файлов MEDIA и правила — передаются в процесс один раз через initializer
+_library_sizes = frozenset()
+_rules = DEFAULT_RULESET
+
+
+def _init_worker(sizes, rules=None):
+    global _library_sizes, _rules
+    _library_sizes = frozenset(sizes)
+    _rules = rules or DEFAULT_RULESET
+
+
+def analyze(rec: FileRecord, want_date: bool, sizes=None, want_phash: bool = False,
+            rules: RuleSet | None = None) -> Analysis:
+    """Классификация, дата съёмки (для медиа и правил с датой) и отпечаток, если размер уже встречался"""
+    dt = source = partial = phash = None
+    read = 0
+    ops = _Ops()
+    resolved = []
+
+    def capture_date():
+        # Правилам с датой и сортировке в MEDIA — одна и та же дата съёмки
+        if not resolved:
+            resolved.append(resolve_capture_date(rec, ops))
+        return resolved[0][0]
+
+    bucket = (rules or _rules).classify(rec, capture_date)
+    if want_date and bucket == MEDIA:
+        capture_date()
+    if resolved:
+        dt, source = resolved[0]
+    if rec.size in (_library_sizes if sizes is None else sizes):
+        partial, read = partial_digest(rec)
+    if want_phash and rec.suffix in PHASH_EXT:
+        phash = dhash(rec.path)
+    return Analysis(bucket, dt, source, partial, read, phash, ops.counts or None)
+
+
+def analyze_batch(records, want_date: bool, want_phash: bool = False):
+    return [analyze(rec, want_date, want_phash=want_phash) for rec in records]
+
+
+class AnalysisPool:
+    """Пул процессов для анализа файлов; перемещения остаются в вызывающем потоке.
+
+    map() отдаёт пары (запись, Analysis) в исходном порядке, держа в работе
+    не больше workers * BATCHES_PER_WORKER пачек — память не растёт
+    и на бесконечном (потоковом) входе.
+    """
+
+    def __init__(self, workers: int, want_date: bool = True, sizes=(),
+                 batch_size: int = BATCH_SIZE, want_phash: bool = False,
+                 rules: RuleSet | None = None):
+        self.workers = max(1, workers)
+        self.want_date = want_date
+        self.want_phash = want_phash
+        self.batch_size = batch_size
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(tuple(sizes), rules)
+        )
+
+    def map(self, records):
+        in_flight = deque()
+        batch = []
+        for rec in records:
+            batch.append(rec)
+            if len(batch) >= self.batch_size:
+                in_flight.append((batch, self._pool.submit(analyze_batch, batch, self.want_date, self.want_phash)))
+                batch = []
+                if len(in_flight) >= self.workers * BATCHES_PER_WORKER:
+                    yield from self._collect(in_flight.popleft())
+        if batch:
+            in_flight.append((batch, self._pool.submit(analyze_batch, batch, self.want_date, self.want_phash)))
+        while in_flight:
+            yield from self._collect(in_flight.popleft())
+
+    @staticmethod
+    def _collect(item):
+        batch, future = item
+        return zip(batch, future.result())
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
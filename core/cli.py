@@ -0,0 +1,138 @@
+import argparse
+import json
+import multiprocessing
+import signal
+import sys
+from datetime import datetime
+
+from .engine import Organizer, MODES
+from .perceptual import NEAR_DISTANCE
+from .undo import latest_undo_log
+from .watch import WATCH_QUIET
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(
+        prog="python -m core",
+        description="Photo & Video Organizer without GUI"
+    )
+    ap.add_argument("mode", nargs="?", choices=MODES, help="not needed with --execute/--rollback")
+    ap.add_argument("--media", help="MEDIA folder (library, sorted by year/month)")
+    ap.add_argument("--temp", help="TEMP folder to sort (not needed for 'index')")
+    ap.add_argument("--streaming", action="store_true", help="process files while scanning")
+    ap.add_argument("--threads", type=int, default=4, help="move threads (1 = inline)")
+    ap.add_argument("--workers", type=int, default=1, help="analysis processes for dates and hashes")
+    ap.add_argument("--no-incremental", action="store_true", help="ignore the run journal")
+    ap.add_argument("--verify", action="store_true",
+                    help="checksum files copied across devices before deleting the source")
+    ap.add_argument("--distance", type=int, default=NEAR_DISTANCE,
+                    help="similar mode: max Hamming distance of 64-bit dHash")
+    ap.add_argument("--watch", action="store_true",
+                    help="keep running and sort new files as they arrive in TEMP (Ctrl+C to stop)")
+    ap.add_argument("--settle", type=float, default=WATCH_QUIET,
+                    help="watch: seconds a file must stay unchanged before it is sorted")
+    ap.add_argument("--poll", action="store_true", help="watch: poll folders instead of inotify")
+    ap.add_argument("--rules", help="JSON file with sorting rules (default: built-in)")
+    ap.add_argument("--plan", help="dry run: write the move plan to this file, touch nothing")
+    ap.add_argument("--execute", metavar="PLAN", help="run a saved plan without scanning")
+    ap.add_argument("--rollback", metavar="LOG",
+                    help="undo a run from its move log ('last' = newest log in --temp)")
+    ap.add_argument("--profile", help="save cProfile stats to this file (view with pstats)")
+    ap.add_argument("--report", help="write a JSON run report to this file ('-' for stdout)")
+    ap.add_argument("--quiet", action="store_true", help="no log on stderr")
+    return ap
+
+
+def make_report(args, results: dict, started: datetime) -> dict:
+    """Отчёт для машин: счётчики, байты, время по фазам и ошибки"""
+    counts = {k: v for k, v in results.items()
+              if k not in ("moved", "timings", "errors", "throughput", "elapsed", "plan",
+                           "phases", "ops", "similar", "undo")}
+    counts["moved"] = len(results["moved"])
+    report = {
+        "mode": args.mode,
+        "media": args.media,
+        "temp": args.temp,
+        "plan": results.get("plan") or args.execute,
+        "undo": results.get("undo"),
+        "started": started.isoformat(timespec="seconds"),
+        "elapsed": results["elapsed"],
+        "counts": counts,
+        "throughput": results["throughput"],
+        "timings": results["timings"],
+        "phases": results["phases"],
+        "ops": results["ops"],
+        "errors": results["errors"],
+    }
+    if "similar" in results:
+        report["similar"] = [
+            {"file": f, "original": original, "score": score}
+            for f, original, score in results["similar"]
+        ]
+    return report
+
+
+def main(argv=None) -> int:
+    multiprocessing.freeze_support()
+    ap = build_parser()
+    args = ap.parse_args(argv)
+    if args.rollback == "last":
+        if not args.temp:
+            ap.error("--rollback last needs --temp")
+        args.rollback = latest_undo_log(args.temp)
+        if not args.rollback:
+            ap.error(f"no undo logs in {args.temp}")
+    if not args.execute and not args.rollback:
+        if not args.mode or not args.media:
+            ap.error("mode and --media are required (or --execute PLAN / --rollback LOG)")
+        if args.mode != "index" and not args.temp:
+            ap.error("--temp is required for this mode")
+    if args.watch and (args.execute or args.rollback or args.plan or args.mode == "index"):
+        ap.error("--watch can't be combined with --plan, --execute, --rollback or 'index'")
+
+    def log(text):
+        if not args.quiet:
+            print(text, file=sys.stderr, flush=True)
+
+    options = dict(
+        streaming=args.streaming, move_threads=args.threads,
+        incremental=not args.no_incremental, analysis_workers=args.workers,
+        profile=args.profile, verify_copies=args.verify, similar_distance=args.distance,
+        rules=args.rules, watch=args.watch, watch_quiet=args.settle, watch_polling=args.poll,
+        on_message=log,
+    )
+    try:
+        if args.execute or args.rollback:
+            if args.rollback:
+                organizer = Organizer.from_undo(args.rollback, **options)
+            else:
+                organizer = Organizer.from_plan(args.execute, **options)
+            args.mode = organizer.mode
+            args.media = str(organizer.media_root)
+            args.temp = str(organizer.temp_root)
+        else:
+            organizer = Organizer(args.mode, args.media, args.temp or args.media,
+                                  plan_out=args.plan, **options)
+    except (OSError, ValueError) as e:
+        log(f"❌ Error: {e}")
+        return 1
+    started = datetime.now()
+    if args.watch:
+        # Ctrl+C завершает слежение штатно: пачка доделывается, отчёт пишется
+        signal.signal(signal.SIGINT, lambda *_: organizer.stop())
+    try:
+        results = organizer.run()
+    except Exception as e:
+        log(f"❌ Error: {e}")
+        return 1
+
+    if args.report:
+        text = json.dumps(make_report(args, results, started), ensure_ascii=False, indent=2)
+        if args.report == "-":
+            print(text)
+        else:
+            with open(args.report, "w", encoding="utf-8") as fh:
+                fh.write(text + "\n")
+            log(f"📝 Report saved to {args.report}")
+    # Ненулевой код, если часть файлов обработать не удалось
+    return 3 if results["errors"] else 0
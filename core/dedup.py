@@ -0,0 +1,143 @@
+import hashlib
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from .file_utils import FileRecord, is_media_file
+
+# Сколько байт читаем с начала и с конца файла для частичного хеша
+PARTIAL_CHUNK = 64 * 1024
+FULL_HASH_BUFFER = 1024 * 1024
+
+
+def partial_digest(rec: FileRecord):
+    """(хеш первых и последних 64 KB или None, сколько байт прочитано)"""
+    read = 0
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(rec.path, "rb") as fh:
+            head = fh.read(PARTIAL_CHUNK)
+            digest.update(head)
+            read += len(head)
+            if rec.size > 2 * PARTIAL_CHUNK:
+                fh.seek(rec.size - PARTIAL_CHUNK)
+            if rec.size > PARTIAL_CHUNK:
+                tail = fh.read(PARTIAL_CHUNK)
+                digest.update(tail)
+                read += len(tail)
+        return digest.digest(), read
+    except OSError:
+        return None, read
+
+
+class DuplicateIndex:
+    """Поиск дубликатов по содержимому: размер → частичный хеш → полный хеш.
+
+    Хеши считаются лениво и только для файлов, у которых совпал размер
+    с кем-то ещё, полный хеш — только если совпал и частичный. Каждый файл
+    читается не больше одного раза на каждую стадию. cache (LibraryIndex)
+    хранит хеши MEDIA-файлов между запусками. С library в памяти только
+    список размеров библиотеки, а сами файлы-кандидаты запрашиваются
+    из SQLite по размеру, когда в TEMP попался файл такого же размера.
+    """
+
+    def __init__(self, cache=None, library=None):
+        self.cache = cache
+        self.library = library
+        self.library_sizes = library.sizes() if library else array("q")
+        self._pending = defaultdict(list)   # size -> записи без частичного хеша
+        self._by_partial = defaultdict(list)  # (size, partial) -> записи
+        self._promoted = set()                # размеры, уже разобранные по частичному хешу
+        self._filled = set()                  # из них — где есть с кем сравнивать
+        self._partial = {}
+        self._full = {}
+        self.bytes_hashed = 0
+
+    def add(self, rec: FileRecord):
+        self._pending[rec.size].append(rec)
+
+    def _in_library(self, size: int) -> bool:
+        sizes = self.library_sizes
+        i = bisect_left(sizes, size)
+        return i < len(sizes) and sizes[i] == size
+
+    def has_size(self, size: int) -> bool:
+        return size in self._pending or size in self._promoted or self._in_library(size)
+
+    def known_sizes(self):
+        return set(self._pending) | self._promoted | set(self.library_sizes)
+
+    def find(self, rec: FileRecord) -> FileRecord | None:
+        """Уже известный файл с тем же содержимым, что и rec, или None"""
+        if not self.has_size(rec.size):
+            return None
+        self._promote(rec.size)
+        if rec.size not in self._filled:
+            return None   # размер совпал только с не-медиа файлами библиотеки — хешировать незачем
+        partial = self._partial_of(rec)
+        if partial is None:
+            return None
+        for other in self._by_partial.get((rec.size, partial), ()):
+            if other.path == rec.path:
+                continue
+            # Файл целиком покрыт частичным хешем — полный не нужен
+            if rec.size <= 2 * PARTIAL_CHUNK:
+                return other
+            full = self._full_of(rec)
+            if full is not None and full == self._full_of(other):
+                return other
+        return None
+
+    def _promote(self, size):
+        """Досчитать частичные хеши для ожидающих файлов этого размера"""
+        candidates = self._pending.pop(size, [])
+        if size not in self._promoted and self._in_library(size):
+            # Оригиналы из MEDIA — первыми, как раньше при полной загрузке
+            candidates = [rec for rec in self.library.records_of_size(size)
+                          if is_media_file(rec)] + candidates
+        self._promoted.add(size)
+        for other in candidates:
+            partial = self._partial_of(other)
+            if partial is not None:
+                self._by_partial[(size, partial)].append(other)
+                self._filled.add(size)
+
+    def seed_partial(self, rec: FileRecord, value: bytes):
+        """Частичный хеш, уже посчитанный снаружи (пулом процессов)"""
+        if value is not None:
+            self._partial.setdefault(str(rec.path), value)
+
+    def _partial_of(self, rec):
+        key = str(rec.path)
+        if key in self._partial:
+            return self._partial[key]
+        if self.cache and (value := self.cache.get_partial(rec)) is not None:
+            self._partial[key] = value
+            return value
+        value, read = partial_digest(rec)
+        self.bytes_hashed += read
+        self._partial[key] = value
+        if self.cache:
+            self.cache.put_partial(rec, value)
+        return value
+
+    def _full_of(self, rec):
+        key = str(rec.path)
+        if key in self._full:
+            return self._full[key]
+        if self.cache and (value := self.cache.get_full(rec)) is not None:
+            self._full[key] = value
+            return value
+        try:
+            digest = hashlib.blake2b(digest_size=32)
+            with open(rec.path, "rb") as fh:
+                while chunk := fh.read(FULL_HASH_BUFFER):
+                    digest.update(chunk)
+                    self.bytes_hashed += len(chunk)
+            value = digest.digest()
+        except OSError:
+            value = None
+        self._full[key] = value
+        if self.cache:
+            self.cache.put_full(rec, value)
+        return value
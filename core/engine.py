@@ -0,0 +1,924 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .file_utils import (
+    FileRecord, StatCounter, scan_files,
+    is_media_file,
+    is_duplicate_in_folder, safe_move_to
+)
+from .executor import MoveExecutor, folder_lock
+from .dedup import DuplicateIndex
+from .library_index import LibraryIndex
+from .run_journal import RunJournal
+from .metadata import resolve_capture_date, EXIF, NAME, SYSTEM
+from .folder_cache import FolderCache
+from .ledger import MoveLedger
+from .rules import MEDIA, MEDIA_TARGET, RESULT_COUNTERS, as_ruleset
+from . import perceptual
+from .perceptual import HammingIndex, NEAR_DISTANCE, PHASH_EXT
+from .plan import DestinationView, PlanWriter, read_plan, read_plan_header
+from .undo import UndoLog, read_undo, read_undo_header, mark_rolled_back
+from .mover import move_no_clobber
+from .watch import QuietFiles, open_watcher, WATCH_QUIET, WATCH_BATCH, WAKE_INTERVAL
+
+MODES = ("full", "duplicates", "trash", "similar", "index")
+
+# Ключ счётчика в results для каждого источника даты
+DATE_COUNTERS = {EXIF: "exif", NAME: "name_date", SYSTEM: "system_date"}
+
+# Строка лога для шага плана по ключу счётчика
+STEP_TEXT = {
+    "sorted": "📅 Sorted", "duplicates": "🔁 Duplicate", "screenshots": "📸 Screenshot",
+    "compressed": "📦 <100KB", "other": "🗑️ Other",
+}
+
+# Размер очереди между обходом и обработкой в потоковом режиме
+STREAM_QUEUE_SIZE = 1024
+
+
+def _ignore(*args):
+    pass
+
+
+class Organizer:
+    """Движок сортировки без Qt: им пользуются и ScannerWorker, и CLI.
+
+    О ходе работы сообщает через колбэки on_progress(pct), on_counts(done, found)
+    и on_message(text); run() возвращает словарь results или бросает исключение.
+    """
+
+    def __init__(self, mode: str, media_path: str, temp_path: str,
+                 streaming: bool = False, move_threads: int = 4,
+                 incremental: bool = True, analysis_workers: int = 1,
+                 plan_out=None, plan_in=None, profile=None, verify_copies=False,
+                 similar_distance: int = NEAR_DISTANCE, undo_in=None, rules=None,
+                 watch=False, watch_quiet: float = WATCH_QUIET, watch_polling=False,
+                 on_progress=_ignore, on_counts=_ignore, on_message=_ignore):
+        self.on_progress = on_progress
+        self.on_counts = on_counts
+        self.on_message = on_message
+        self.analysis_workers = analysis_workers   # >1 — даты и хеши в пуле процессов
+        self.plan_out = plan_out   # пробный прогон: план в файл, файлы не трогаем
+        self.plan_in = plan_in     # выполнить готовый план без обхода TEMP
+        self.undo_in = undo_in     # откатить запуск по его журналу
+        self.undo = None
+        self.plan = None
+        self.destination = None
+        self.folders = None        # листинги папок назначения (FolderCache)
+        self.profile = profile     # путь для статистики cProfile (pstats)
+        self.verify_copies = verify_copies   # сверять хеш при переносе на другой диск
+        self.similar_distance = similar_distance   # порог Хэмминга для похожих фото
+        self.similar = None
+        self.rules = as_ruleset(rules)   # правила сортировки: JSON, список или встроенные
+        self._rule_folders = {}
+        self.watch = watch                 # не завершаться: следить за TEMP до stop()
+        self.watch_quiet = watch_quiet     # сколько секунд файл не должен меняться
+        self.watch_polling = watch_polling   # опрос вместо inotify
+        self._stop = threading.Event()
+        self.pool = None
+        self.mode = mode
+        self.streaming = streaming
+        self.incremental = incremental      # пропускать файлы, уже разобранные раньше
+        self.journal = None
+        self.move_threads = move_threads   # 1 — перемещать прямо в этом потоке
+        self.executor = None
+        self.dup_index = None
+        self.library = None
+        self.media_root = Path(media_path)   # ← КУДА: media/2025/12/
+        # ← ОТКУДА: temp/; проверке индекса TEMP не нужен — служебные файлы в MEDIA, как в CLI
+        self.temp_root = Path(temp_path if temp_path is not None else media_path)
+        # Папки — ВСЕ внутри temp/other/ (как в KB)
+        self.other_root = self.temp_root / "other"
+        self.duplicates_path = self.other_root / "duplicates"
+        self.stats = StatCounter()
+        self.timings = {}
+        self.errors = []
+
+    @classmethod
+    def from_plan(cls, path, **kwargs):
+        """Режим и папки берутся из заголовка плана"""
+        header = read_plan_header(path)
+        return cls(header["mode"], header["media"], header["temp"], plan_in=path, **kwargs)
+
+    @classmethod
+    def from_undo(cls, path, **kwargs):
+        """Откат: режим и папки — из заголовка журнала перемещений"""
+        header = read_undo_header(path)
+        return cls(header["mode"], header["media"], header["temp"], undo_in=path, **kwargs)
+
+    def log(self, text: str):
+        self.on_message(text)
+
+    def error(self, text: str):
+        """Ошибка по отдельному файлу — в лог и в отчёт, работа продолжается"""
+        self.errors.append(text)
+        self.on_message(text)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+
+    def safe_iterdir(self, path: Path, exclude=()):
+        """Безопасное сканирование — без зависаний, stat один раз на файл"""
+        def on_error(p, e):
+            self.error(f"⚠️ Skipped {p}: {e}")
+        yield from scan_files(path, self.stats, on_error, exclude)
+
+    def run(self) -> dict:
+        if not self.profile:
+            return self._run()
+        # Профилируется координирующий поток; для полной картины — move_threads=1
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(self._run)
+        finally:
+            profiler.dump_stats(self.profile)
+            self.log(f"🔬 Profile saved to {self.profile}")
+
+    def _run(self) -> dict:
+        self.stats = StatCounter()
+        self.folders = FolderCache(counter=self.stats)
+        self.timings = {}
+        self.errors = []
+        self.dup_index = None
+        self.similar = None
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown mode: {self.mode}")
+        replay = self.plan_in or self.undo_in   # TEMP не сканируется
+        if self.watch and (replay or self.plan_out or self.mode == "index"):
+            raise ValueError("Watch mode works only for full, duplicates, trash and similar runs")
+        if self.mode == "similar" and not replay and not perceptual.available():
+            raise RuntimeError(perceptual.MISSING_DEPS)
+        completed = False
+        try:
+            dry_run = self.plan_out and not self.plan_in
+            if self.mode in ("full", "duplicates", "similar", "index") or \
+                    self.mode == "trash" and self._rules_reach_media():
+                with self.phase("index"):
+                    self._open_library(read_only=dry_run)
+            if self.mode == "index":
+                return self._run_index()
+            if self.mode == "duplicates" and not replay:
+                with self.phase("index"):
+                    self._build_dup_index()
+            if self.incremental and not dry_run and not self.undo_in:
+                self._open_journal()
+            # План строится в одном потоке: имена в DestinationView выдаются по порядку
+            if self.move_threads > 1 and not dry_run:
+                self.executor = MoveExecutor(self.move_threads)
+            if dry_run:
+                self.destination = DestinationView()
+                self.plan = PlanWriter(self.plan_out, self.mode, self.media_root, self.temp_root)
+            elif not self.undo_in:
+                self.undo = UndoLog(self.temp_root, self.mode, self.media_root)
+            if self.undo_in:
+                results = self._run_rollback()
+            elif self.plan_in:
+                results = self._run_plan()
+            else:
+                if self.analysis_workers > 1 and self.mode in ("full", "duplicates", "similar"):
+                    # Пул процессов нужен не всегда — не тянем multiprocessing без нужды
+                    from .analysis import AnalysisPool
+                    sizes = self.dup_index.known_sizes() if self.dup_index else ()
+                    self.pool = AnalysisPool(self.analysis_workers, self.mode == "full", sizes,
+                                             want_phash=self.mode == "similar", rules=self.rules)
+                if self.mode == "similar":
+                    with self.phase("index"):
+                        self._build_similar_index()
+                if self.watch:
+                    results = self._run_watch()
+                elif self.streaming:
+                    results = self._run_streaming()
+                else:
+                    results = self._run_batch()
+            completed = True
+            if self.undo and self.undo.count:
+                results["undo"] = str(self.undo.path)
+                self.log(f"↩️ Undo log: {self.undo.path}")
+            if self.plan:
+                results["plan"] = str(self.plan.path)
+                self.log(f"📝 Plan with {self.plan.count} moves saved to {self.plan.path}")
+            return results
+        finally:
+            if self.plan:
+                self.plan.close(keep=completed)
+                self.plan = None
+            self.destination = None
+            if self.undo:
+                self.undo.close()
+                self.undo = None
+            if self.pool:
+                self.pool.shutdown()
+                self.pool = None
+            if self.executor:
+                self.executor.shutdown()
+                self.executor = None
+            if self.library:
+                self.library.close()
+                self.library = None
+            if self.journal:
+                self.journal.close()
+                self.journal = None
+
+    def _open_library(self, read_only=False):
+        """Индекс MEDIA; при первом запуске строится обходом библиотеки"""
+        self.library = LibraryIndex(self.media_root, read_only=bool(read_only))
+        if self.library.is_empty() and self.mode != "index":
+            self.log("📚 Building MEDIA index (first run)...")
+            counts = self.library.verify(self.safe_iterdir(self.media_root))
+            self.log(f"📚 Indexed {counts['added']} library files")
+
+    def _run_index(self):
+        """Режим проверки/перестройки индекса — сверка только по size и mtime"""
+        self.log(f"📚 Verifying MEDIA index {self.library.path}...")
+        started = time.perf_counter()
+        with self.phase("verify"):
+            counts = self.library.verify(self.safe_iterdir(self.media_root))
+        results = self._new_results()
+        results.update(counts)
+        self._finish_results(results, time.perf_counter() - started)
+        self.log(
+            f"📚 Added {counts['added']}, updated {counts['updated']}, "
+            f"removed {counts['removed']}, unchanged {counts['unchanged']}"
+        )
+        self.on_progress(100)
+        self.log("✅ All done!")
+        return results
+
+    def _open_journal(self):
+        self.journal = RunJournal(self.temp_root)
+        counts = self.journal.recover()
+        if counts["completed"] or counts["retried"]:
+            self.log(
+                f"♻️ Resuming interrupted run: {counts['completed']} moves completed, "
+                f"{counts['retried']} will be retried"
+            )
+        self.journal.load(self.mode)
+
+    def _build_dup_index(self):
+        """MEDIA-библиотека — кандидаты в оригиналы: в памяти только размеры,
+        файлы запрашиваются из индекса по размеру (без обхода и без загрузки всей таблицы)"""
+        self.dup_index = DuplicateIndex(cache=self.library, library=self.library)
+        self.log(f"📚 {len(self.dup_index.library_sizes)} library file sizes loaded from index")
+
+    def _build_similar_index(self):
+        """Индекс dHash по фото MEDIA; хеш каждого файла считается один раз и живёт в индексе"""
+        self.similar = HammingIndex(self.similar_distance)
+        missing = []
+        for rec, raw in self.library.photo_hashes(PHASH_EXT):
+            if raw:
+                self.similar.add(perceptual.from_bytes(raw), rec)
+            else:
+                missing.append(rec)
+        if missing:
+            self.log(f"🖼️ Hashing {len(missing)} library photos...")
+            for rec, value in self._phashes(missing):
+                if value is not None:
+                    self.library.put_phash(rec, perceptual.to_bytes(value))
+                    self.similar.add(value, rec)
+        self.log(f"📚 {self.similar.size} library photos in similarity index")
+
+    def _phashes(self, records):
+        if self.pool:
+            for rec, info in self._pooled(records):
+                yield rec, info.phash
+        else:
+            for rec in records:
+                yield rec, perceptual.dhash(rec.path)
+
+    def _run_batch(self):
+        self.log("🔍 Scanning TEMP folder...")
+        # temp/other/ не сканируем — там уже разобранное, иначе повторный
+        # запуск переложил бы те же файлы второй раз
+        with self.phase("scan"):
+            files = list(self.safe_iterdir(self.temp_root, self._sorted_folders()))  # ← ТОЛЬКО TEMP!
+        total = len(files)
+        self.log(f"✅ Found {total} files. Starting '{self.mode}'...")
+
+        results = self._new_results()
+        started = time.perf_counter()
+
+        with self.phase("process"):
+            if self.mode == "duplicates":
+                self._process_duplicates(files, results, total)
+            elif self.mode == "trash":
+                self._process_trash(files, results, total)
+            elif self.mode == "full":
+                self._process_full(files, results, total)
+            elif self.mode == "similar":
+                self._process_similar(files, results, total)
+            self._drain(results, wait=True)
+        if self.journal:
+            self.journal.forget_unseen(self.mode)
+
+        self._finish_results(results, time.perf_counter() - started)
+        self.on_progress(100)
+        self.log("✅ All done!")
+        return results
+
+    def _new_results(self):
+        # exif / name_date / system_date — как $exifCount / $nameCount / $systemCount в PS
+        results = {
+            "moved": MoveLedger(), "screenshots": 0, "compressed": 0, "other": 0,
+            **dict.fromkeys(RESULT_COUNTERS, 0)
+        }
+        if self.mode == "similar":
+            results["similar"] = []   # (файл, оригинал, похожесть 0..1)
+        for rule in self.rules.rules:
+            results.setdefault(rule.name, 0)
+        return results
+
+    def _finish_results(self, results, elapsed):
+        results["stat_calls"] = self.stats.calls
+        results["timings"] = dict(self.timings)
+        results["phases"] = dict(self.stats.seconds)
+        ops = dict(self.stats.ops, stat=self.stats.calls)
+        if self.dup_index:
+            ops["bytes_read"] = ops.get("bytes_read", 0) + self.dup_index.bytes_hashed
+        results["ops"] = ops
+        if results["phases"]:
+            self.log("⏱️ Phases: " + ", ".join(
+                f"{name} {seconds:.2f}s" for name, seconds in
+                sorted(results["phases"].items(), key=lambda item: -item[1])
+            ))
+        results["errors"] = list(self.errors)
+        if self.dup_index:
+            results["bytes_hashed"] = self.dup_index.bytes_hashed
+        results["elapsed"] = elapsed
+        moved = len(results["moved"])
+        results["throughput"] = {
+            "files_per_s": moved / elapsed if elapsed > 0 else 0.0,
+            "mb_per_s": results["bytes_moved"] / 1048576 / elapsed if elapsed > 0 else 0.0,
+        }
+        self.log(
+            f"⏱️ {moved} files in {elapsed:.1f}s — "
+            f"{results['throughput']['files_per_s']:.1f} files/s, "
+            f"{results['throughput']['mb_per_s']:.1f} MB/s"
+        )
+
+    def _run_streaming(self):
+        """Обход кормит ограниченную очередь, обработка идёт сразу же"""
+        self.log(f"🔍 Streaming TEMP folder, mode '{self.mode}'...")
+        results = self._new_results()
+        started = time.perf_counter()
+        handler = self._handler()
+
+        q = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        stop = threading.Event()
+        discovered = [0]
+        failure = []
+
+        def put(item) -> bool:
+            # Потребитель мог упасть — тогда stop и очередь никто не разберёт
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def producer():
+            try:
+                # temp/other/ и папки правил пропускаем — туда же и складываем
+                for rec in self.safe_iterdir(self.temp_root, exclude=self._sorted_folders()):
+                    discovered[0] += 1
+                    if not put(rec):
+                        return
+            except Exception as e:
+                failure.append(e)
+            finally:
+                put(None)
+
+        def queued():
+            while (rec := q.get()) is not None:
+                yield rec
+
+        walker = threading.Thread(target=producer, name="temp-walker", daemon=True)
+        walker.start()
+        processed = 0
+        # Обход и обработка идут одновременно — одна общая фаза
+        stream_started = time.perf_counter()
+        try:
+            for f, info in self._analyzed(queued(), results):
+                if handler:
+                    self._visit(handler, f, results, info)
+                self._drain(results)
+                processed += 1
+                found = discovered[0]
+                done = processed + results["skipped"]
+                self.on_counts(done, found)
+                self._update_progress(0, 100, done, found)
+        finally:
+            stop.set()
+            walker.join()
+        if failure:
+            raise failure[0]
+        self._drain(results, wait=True)
+        self.timings["stream"] = time.perf_counter() - stream_started
+        if self.journal:
+            self.journal.forget_unseen(self.mode)
+
+        self._finish_results(results, time.perf_counter() - started)
+        self.on_counts(discovered[0], discovered[0])
+        self.on_progress(100)
+        self.log(f"✅ All done! Processed {discovered[0]} files")
+        return results
+
+    def _handler(self):
+        """Обработчик одного файла для режима"""
+        return {
+            "duplicates": self._handle_duplicate,
+            "trash": self._handle_trash,
+            "full": self._handle_full,
+            "similar": self._handle_similar,
+        }.get(self.mode)
+
+    def stop(self):
+        """Остановить слежение (из другого потока или обработчика сигнала)"""
+        self._stop.set()
+
+    def _run_watch(self):
+        """Слежение за TEMP: новые файлы после затишья — микропачками, без повторных обходов"""
+        results = self._new_results()
+        started = time.perf_counter()
+        handler = self._handler()
+        exclude = self._sorted_folders()
+        with self.phase("scan"):
+            watcher = open_watcher(self.temp_root, exclude, self.watch_polling)
+        settle = QuietFiles(self.watch_quiet)
+        now = time.monotonic()
+        # То, что лежало в TEMP до старта, тоже разбираем — без ожидания
+        for path in watcher.initial:
+            settle.touch(path, now, delay=0)
+        self.log(f"👀 Watching {self.temp_root} via {watcher.kind} "
+                 f"({len(watcher.initial)} files already there). Stop to finish.")
+        processed = 0
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                touched = watcher.wait(settle.timeout(now, WAKE_INTERVAL))
+                if watcher.overflowed:
+                    self.log("⚠️ Too many events at once — rescanning TEMP once")
+                    touched += watcher.rescan()
+                now = time.monotonic()
+                for path in touched:
+                    settle.touch(path, now)
+                while not self._stop.is_set() and (batch := settle.ready(now, self.stats, WATCH_BATCH)):
+                    with self.phase("process"):
+                        self._ingest(handler, batch, results)
+                    processed += len(batch)
+                    self.log(f"📥 Batch of {len(batch)} new files done, {processed} since start")
+                # Заодно будит троттлинг колбэков в воркере — лог не застревает
+                self.on_counts(processed, processed + settle.pending)
+        finally:
+            watcher.close()
+
+        self._finish_results(results, time.perf_counter() - started)
+        self.log(f"✅ Watch stopped. Processed {processed} files")
+        return results
+
+    def _ingest(self, handler, files, results):
+        """Микропачка: обычная маршрутизация, затем всё состояние — на диск"""
+        for f, info in self._analyzed(files, results):
+            self._visit(handler, f, results, info)
+        self._drain(results, wait=True)
+        # Папки могли поменять снаружи, пока мы ждали, — листинги читаем заново
+        self.folders = FolderCache(counter=self.stats)
+        if self.journal:
+            self.journal.commit()
+        if self.library:
+            self.library.commit()
+        if self.undo:
+            self.undo.flush()
+
+    def _update_progress(self, start_pct, end_pct, current, total):
+        if total <= 0:
+            return
+        pct = start_pct + (end_pct - start_pct) * (current / total)
+        self.on_progress(int(pct))
+
+    def _move(self, f, target_folder):
+        if self.destination:
+            return self.destination.reserve(f, target_folder)   # пробный прогон
+        return safe_move_to(f.path, target_folder, self.stats,
+                            self.verify_copies, self.folders, f.size)
+
+    def _date_of(self, f, info=None):
+        """(дата, источник) по запросу: EXIF → имя файла → min(ctime, mtime), как Get-FileDate.
+
+        Заголовок читается не больше раза на файл и только если дата нужна —
+        сортировке в MEDIA или правилу с датой / {year}/{month}.
+        """
+        resolved = [(info.date, info.date_source)] if info and info.date else []
+
+        def resolve():
+            if not resolved:
+                started = time.perf_counter()
+                resolved.append(resolve_capture_date(f, self.stats))
+                self.stats.spent("date", started)
+            return resolved[0]
+        return resolve
+
+    def _capture_date(self, results, resolve):
+        """Дата съёмки для сортировки в MEDIA — с подсчётом источника"""
+        dt, source = resolve()
+        results[DATE_COUNTERS[source]] += 1
+        return dt
+
+    def _month_folder(self, dt):
+        return self.media_root / f"{dt.year}" / f"{dt.month:02d}"
+
+    def _analyzed(self, files, results):
+        """Пропуск по журналу, затем анализ — в пуле процессов или лениво в обработчике"""
+        fresh = (f for f in files if not self._skip(f, results))
+        if self.pool:
+            yield from self._pooled(fresh)
+        else:
+            for f in fresh:
+                yield f, None
+
+    def _pooled(self, records):
+        """pool.map; операции, посчитанные в процессах пула, — в общий StatCounter"""
+        for rec, info in self.pool.map(records):
+            if info.ops:
+                for name, n in info.ops.items():
+                    self.stats.count(name, n)
+            yield rec, info
+
+    def _skip(self, f, results):
+        if not self.journal:
+            return False
+        if self.journal.is_held(f):
+            # Уже разобран в этом запуске и не менялся — слежение получило лишнее событие
+            results["skipped"] += 1
+            return True
+        if not self.journal.is_unchanged(f):
+            return False
+        if self.mode == "similar":
+            # dHash оставленных файлов нигде не хранится — без них новую копию не с чем сравнить
+            return False
+        if self.mode == "duplicates" and is_media_file(f):
+            # Оставленный раньше файл — возможный оригинал для новых копий.
+            # Размер уже встречался — разбираем как обычно, иначе только запоминаем
+            # (хешируется лишь тогда, когда появится файл того же размера)
+            if self.dup_index.has_size(f.size):
+                return False
+            self.dup_index.add(f)
+        self.journal.hold(f)
+        results["skipped"] += 1
+        return True
+
+    def _visit(self, handler, f, results, info=None):
+        """Обработка одного файла режимом; info — готовый Analysis из пула"""
+        try:
+            handler(f, results, info)
+        except Exception as e:
+            self.error(f"Skip {f.name}: {e}")
+            if self.journal:
+                self.journal.hold(f)
+
+    def _keep(self, f):
+        """Файл осмотрен и остаётся в TEMP"""
+        if self.journal:
+            self.journal.keep(f, self.mode)
+
+    def _dispatch(self, results, folder, fn, *args):
+        """Перемещение в folder — сразу или в пуле потоков под замком папки"""
+        if self.journal:
+            self.journal.begin(args[0], self.mode, folder)
+        if self.executor:
+            self.executor.submit(folder, self._attempt, fn, *args)
+            self._drain(results)
+        else:
+            self._apply(results, self._attempt(fn, *args))
+
+    def _attempt(self, fn, f, *args):
+        """fn(f, ...); сбой перемещения возвращается с именем файла — его запишет _apply.
+
+        Журнал отката пишется здесь, в потоке перемещения, а не в _apply:
+        сбой процесса до того, как итог разобран, не оставит перенесённый
+        файл без записи.
+        """
+        try:
+            outcome = fn(f, *args)
+        except Exception as e:
+            failure = OSError(f"{f.name}: {e}")
+            failure.record = f   # файл остался в TEMP — _apply придержит его в журнале
+            return failure
+        if outcome and self.undo:
+            self.undo.append(f.path, outcome[2])
+        return outcome
+
+    def _drain(self, results, wait=False):
+        if self.executor:
+            for outcome in self.executor.drain(wait):
+                self._apply(results, outcome)
+
+    def _apply(self, results, outcome):
+        """Итог перемещения учитывается только в координирующем потоке"""
+        if outcome is None:
+            return
+        if isinstance(outcome, Exception):
+            self.error(f"Skip {outcome}")
+            record = getattr(outcome, "record", None)
+            if self.journal and record:
+                self.journal.hold(record)
+            return
+        key, f, tgt, text = outcome
+        if self.journal:
+            self.journal.done(f, self.mode, tgt)
+        if self.plan:
+            self.plan.add(key, f, tgt)
+        results["moved"].append(f.path, tgt, key, f.size)
+        results[key] += 1
+        results["bytes_moved"] += f.size
+        if text:
+            self.log(text)
+
+    def _move_to(self, f, folder, key, text):
+        tgt = self._move(f, folder)
+        return (key, f, tgt, text) if tgt else None
+
+    def _to_duplicates(self, f):
+        with folder_lock(self.executor, self.duplicates_path):
+            return self._move_to(f, self.duplicates_path, "duplicates", f"🔁 Duplicate: {f.name}")
+
+    def _sort_media(self, f, target_folder, dt):
+        """Проверка дубликата и перемещение — под замком target_folder"""
+        index = self.destination or self.folders
+        started = time.perf_counter()
+        duplicate = is_duplicate_in_folder(f, target_folder, self.stats, index)
+        self.stats.spent("dup_check", started)
+        if duplicate:
+            return self._to_duplicates(f)
+        tgt = self._move(f, target_folder)
+        if not tgt:
+            return None
+        if self.plan:
+            self.plan.note_date(tgt, dt)
+        elif self.library:
+            self.library.record(tgt, f, dt)
+        return ("sorted", f, tgt, f"📅 Sorted: {f.name}")
+
+    def _place_by_rule(self, f, folder, key, text, dt):
+        """Правило с папкой внутри MEDIA: файл попадает в индекс, как у _sort_media"""
+        tgt = self._move(f, folder)
+        if not tgt:
+            return None
+        if self.plan:
+            self.plan.note_date(tgt, dt)
+        elif self.library:
+            self.library.record(tgt, f, dt)
+        return (key, f, tgt, text)
+
+    def _place_planned(self, f, target_folder, dt, key="sorted", text=None):
+        """Шаг плана: решение о дубликате уже принято при планировании.
+
+        Файл, легший в MEDIA, записывается в индекс; record пропускает
+        папки вне MEDIA.
+        """
+        tgt = self._move(f, target_folder)
+        if not tgt:
+            return None
+        if self.library:
+            self.library.record(tgt, f, dt)
+        return (key, f, tgt, text or f"📅 Sorted: {f.name}")
+
+    def _handle_step(self, step, results):
+        """Один шаг плана; файл, изменившийся после планирования, не трогаем"""
+        src = Path(step["src"])
+        self.stats.add()
+        try:
+            st = os.stat(src)
+        except OSError:
+            # Уже перемещён (например, прерванным выполнением этого же плана)
+            results["skipped"] += 1
+            return
+        if st.st_size != step["size"] or st.st_mtime != step["mtime"]:
+            self.error(f"⚠️ Changed since planning: {src}")
+            return
+        f = FileRecord(src, st.st_size, st.st_mtime, st.st_ctime, src.suffix.lower())
+        key, folder = step["key"], Path(step["target"]).parent
+        if key == "sorted":
+            self._dispatch(results, folder, self._place_planned, f, folder, step["date"])
+        else:
+            rule = self.rules.by_name.get(key)
+            label = rule.label if rule else STEP_TEXT.get(key, key)
+            results.setdefault(key, 0)   # правило из другого набора
+            self._dispatch(results, folder, self._place_planned, f, folder, step["date"],
+                           key, f"{label}: {f.name}")
+
+    def _run_plan(self):
+        self.log(f"📝 Executing plan {self.plan_in}...")
+        with open(self.plan_in, encoding="utf-8") as fh:
+            total = sum(1 for _ in fh) - 1
+        results = self._new_results()
+        started = time.perf_counter()
+        with self.phase("process"):
+            for i, step in enumerate(read_plan(self.plan_in)):
+                try:
+                    self._handle_step(step, results)
+                except Exception as e:
+                    self.error(f"Skip {step['src']}: {e}")
+                self._drain(results)
+                self._update_progress(0, 100, i + 1, total)
+            self._drain(results, wait=True)
+
+        self._finish_results(results, time.perf_counter() - started)
+        self.on_progress(100)
+        self.log("✅ All done!")
+        return results
+
+    def _run_rollback(self):
+        """Откат: перемещения журнала в обратном порядке, параллельно по папкам"""
+        self.log(f"↩️ Rolling back {self.undo_in}...")
+        moves = read_undo(self.undo_in)
+        results = self._new_results()
+        results["restored"] = 0
+        started = time.perf_counter()
+        touched = set()
+        with self.phase("process"):
+            for i, (src, dst) in enumerate(moves):
+                self.stats.add()
+                try:
+                    st = os.stat(dst)
+                except OSError:
+                    results["skipped"] += 1   # уже не на месте — трогать нечего
+                    continue
+                f = FileRecord(dst, st.st_size, st.st_mtime, st.st_ctime, dst.suffix.lower())
+                touched.add(dst.parent)
+                self._dispatch(results, src.parent, self._restore, f, src)
+                self._update_progress(0, 100, i + 1, len(moves))
+            self._drain(results, wait=True)
+        self._remove_empty(touched)
+        results["undo"] = str(mark_rolled_back(Path(self.undo_in)))
+
+        self._finish_results(results, time.perf_counter() - started)
+        self.on_progress(100)
+        self.log(f"✅ Restored {results['restored']} of {len(moves)} files")
+        return results
+
+    def _restore(self, f, src):
+        """Вернуть файл на старое место; занятое имя не затирается"""
+        self.folders.ensure_folder(src.parent)
+        try:
+            move_no_clobber(f.path, src, self.verify_copies, self.stats)
+        except FileExistsError:
+            raise FileExistsError(f"{src} already exists, kept {f.path}") from None
+        if self.library:   # индекс MEDIA следует за файлом в обе стороны
+            self.library.forget(f.path)
+            self.library.record(src, f._replace(path=src))
+        return ("restored", f, src, None)
+
+    def _remove_empty(self, folders):
+        """Папки, опустевшие после отката (ГГГГ/ММ, other/...), — удалить"""
+        roots = {self.media_root, self.temp_root}
+        for folder in sorted(folders, key=lambda p: len(p.parts), reverse=True):
+            while folder not in roots and folder.parent != folder:
+                try:
+                    os.rmdir(folder)
+                except OSError:
+                    break
+                folder = folder.parent
+
+    def _handle_duplicate(self, f, results, info=None):
+        """Дубликат по содержимому — в MEDIA или среди уже просмотренных TEMP-файлов"""
+        if not is_media_file(f):
+            self._keep(f)
+            return
+        if info and info.partial:
+            self.dup_index.seed_partial(f, info.partial)
+            self.dup_index.bytes_hashed += info.bytes_read
+        started = time.perf_counter()
+        original = self.dup_index.find(f)
+        self.stats.spent("dup_check", started)
+        if original is None:
+            self.dup_index.add(f)
+            self._keep(f)
+            return
+        self._dispatch(results, self.duplicates_path, self._move_to, f, self.duplicates_path,
+                       "duplicates", f"🔁 Duplicate: {f.name} = {original.path}")
+
+    def _classify(self, f, info=None, capture_date=None):
+        if info:
+            return info.bucket   # уже посчитано в пуле процессов
+        started = time.perf_counter()
+        bucket = self.rules.classify(f, capture_date)
+        self.stats.spent("classify", started)
+        return bucket
+
+    def _rule_folder(self, rule, f, capture_date=None):
+        folder = self._rule_folders.get(rule.name)
+        if folder is None:
+            folder = rule.folder(f, self.media_root, self.temp_root, capture_date)
+            if "{" not in rule.target:
+                self._rule_folders[rule.name] = folder
+        return folder
+
+    def _rules_reach_media(self) -> bool:
+        """Есть правило, кладущее файлы в MEDIA по своей папке ({media}/... или путь туда)"""
+        for rule in self.rules.rules:
+            if not rule.target or rule.target == MEDIA_TARGET:
+                continue
+            if "{media}" in rule.target or Path(rule.target).is_absolute() and \
+                    Path(rule.target).is_relative_to(self.media_root):
+                return True
+        return False
+
+    def _sorted_folders(self):
+        """Куда раскладываем внутри TEMP — при обходе не заходим"""
+        folders = [self.other_root]
+        for rule in self.rules.rules:
+            if rule.target and "{" not in rule.target and rule.target != MEDIA_TARGET:
+                folders.append(rule.folder(None, self.media_root, self.temp_root))
+        return folders
+
+    def _handle_trash(self, f, results, info=None, bucket=None, resolve=None):
+        resolve = resolve or self._date_of(f, info)
+        date = lambda: resolve()[0]  # noqa: E731
+        bucket = bucket or self._classify(f, info, date)
+        rule = self.rules.by_name.get(bucket)
+        if rule is None:   # MEDIA или KEEP — в этом режиме остаются на месте
+            self._keep(f)
+            return
+        folder = self._rule_folder(rule, f, date)
+        if folder == f.path.parent:   # уже разложен по шаблону прошлым запуском
+            self._keep(f)
+            return
+        text = f"{rule.label}: {f.name}"
+        if self.library and folder.is_relative_to(self.media_root):
+            self._dispatch(results, folder, self._place_by_rule, f, folder, rule.name, text, date())
+        else:
+            self._dispatch(results, folder, self._move_to, f, folder, rule.name, text)
+
+    def _handle_full(self, f, results, info=None):
+        """Полный режим для одного файла: одна корзина, O(1) работы"""
+        resolve = self._date_of(f, info)
+        bucket = self._classify(f, info, lambda: resolve()[0])
+        if bucket != MEDIA:
+            self._handle_trash(f, results, bucket=bucket, resolve=resolve)
+            return
+        # Заголовок файла читается точечно, stat не повторяется
+        dt = self._capture_date(results, resolve)
+        target_folder = self._month_folder(dt)
+        self._dispatch(results, target_folder, self._sort_media, f, target_folder, dt)
+
+    def _process_duplicates(self, files, results, total):
+        media_files = [f for f in files if is_media_file(f)]
+        for i, (f, info) in enumerate(self._analyzed(media_files, results)):
+            self._visit(self._handle_duplicate, f, results, info)
+            self._update_progress(0, 100, i + 1 + results["skipped"], len(media_files))
+
+    def _handle_similar(self, f, results, info=None):
+        """Похожее фото (пересжатая/уменьшенная копия) — в MEDIA или среди просмотренных TEMP"""
+        if f.suffix not in PHASH_EXT:
+            self._keep(f)
+            return
+        if info:
+            value = info.phash
+        else:
+            started = time.perf_counter()
+            value = perceptual.dhash(f.path)
+            self.stats.spent("phash", started)
+        if value is None:
+            self._keep(f)
+            return
+        started = time.perf_counter()
+        match = self.similar.nearest(value)
+        self.stats.spent("dup_check", started)
+        if match is None:
+            self.similar.add(value, f)
+            self._keep(f)
+            return
+        distance, original = match
+        score = perceptual.similarity(distance)
+        results["similar"].append((str(f.path), str(original.path), round(score, 3)))
+        self._dispatch(results, self.duplicates_path, self._move_to, f, self.duplicates_path,
+                       "duplicates", f"🪞 Similar {score:.0%}: {f.name} ≈ {original.path}")
+
+    def _process_similar(self, files, results, total):
+        photos = [f for f in files if f.suffix in PHASH_EXT]
+        for i, (f, info) in enumerate(self._analyzed(photos, results)):
+            self._visit(self._handle_similar, f, results, info)
+            self._update_progress(0, 100, i + 1 + results["skipped"], len(photos))
+
+    def _process_trash(self, files, results, total):
+        for i, (f, info) in enumerate(self._analyzed(files, results)):
+            self._visit(self._handle_trash, f, results, info)
+            self._update_progress(0, 100, i + 1 + results["skipped"], total)
+
+    def _process_full(self, files, results, total):
+        # Один проход: каждый файл сразу уходит в свою корзину
+        for i, (f, info) in enumerate(self._analyzed(files, results)):
+            self._visit(self._handle_full, f, results, info)
+            self._update_progress(0, 100, i + 1 + results["skipped"], total)
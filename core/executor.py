@@ -0,0 +1,69 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
+# Сколько перемещений может висеть в очереди на один поток
+PENDING_PER_THREAD = 64
+
+
+class MoveExecutor:
+    """Пул потоков для перемещений.
+
+    Задачи с одной и той же папкой назначения выполняются строго по очереди
+    (под замком папки), поэтому логика name(i).ext остаётся корректной.
+    Разные папки YYYY/MM обрабатываются параллельно. Результаты задач
+    складываются в очередь и забираются координирующим потоком через drain().
+    """
+
+    def __init__(self, threads: int = 4):
+        self.threads = max(1, threads)
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="mover")
+        self._slots = threading.BoundedSemaphore(self.threads * PENDING_PER_THREAD)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._done = queue.SimpleQueue()
+        self._pending = 0
+
+    def lock_for(self, folder: Path):
+        key = str(folder)
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def submit(self, folder: Path, fn, *args):
+        """fn(*args) выполнится под замком folder; результат — в drain()"""
+        self._slots.acquire()
+        self._pending += 1
+        self._pool.submit(self._run, folder, fn, args)
+
+    def _run(self, folder, fn, args):
+        try:
+            with self.lock_for(folder):
+                out = fn(*args)
+        except Exception as e:
+            out = e
+        finally:
+            self._slots.release()
+        self._done.put(out)
+
+    def drain(self, wait: bool = False):
+        """Готовые результаты; wait=True — дождаться всех отправленных задач"""
+        while self._pending:
+            try:
+                out = self._done.get(block=wait)
+            except queue.Empty:
+                return
+            self._pending -= 1
+            yield out
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+def folder_lock(executor: MoveExecutor | None, folder: Path):
+    """Замок папки при параллельной работе, пустой контекст — без неё"""
+    return executor.lock_for(folder) if executor else nullcontext()
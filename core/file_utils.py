@@ -1,4 +1,12 @@
-﻿from pathlib import Path
+﻿
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import NamedTuple
+
+from .mover import move_no_clobber
 
 # Поддерживаемые расширения — как в KB
 MEDIA_EXT = {
@@ -14,43 +22,161 @@ SCREENSHOT_KEYWORDS = {
     'screencapture', 'prntscrn', 'запись экрана', 'снимок экрана'
 }
 
-def is_media_file(path: Path) -> bool:
-    return path.suffix.lower() in MEDIA_EXT
+SMALL_FILE_LIMIT = 100 * 1024
 
-def is_small_file(path: Path) -> bool:
-    """Менее 100 KB — для compressed/other"""
-    try:
-        return path.stat().st_size < 100 * 1024
-    except:
-        return False
+# Служебные файлы и папки программы (индекс, журналы) — обход их не видит
+SERVICE_PREFIX = ".pvo_"
 
-def is_screenshot(path: Path) -> bool:
-    """ТОЛЬКО по имени — без ограничения по размеру"""
-    name = path.stem.lower()
-    return any(kw in name for kw in SCREENSHOT_KEYWORDS)
 
-def is_duplicate_in_folder(file_path: Path, target_folder: Path) -> bool:
-    """Только имя + размер — как в PowerShell"""
-    target = target_folder / file_path.name
-    if not target.exists():
-        return False
+class FileRecord(NamedTuple):
+    """Компактная запись о файле: stat снимается один раз при обходе"""
+    path: Path
+    size: int
+    mtime: float
+    ctime: float
+    suffix: str  # в нижнем регистре
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @property
+    def stem(self) -> str:
+        return self.path.stem
+
+
+class StatCounter:
+    """Счётчики запуска — потокобезопасно.
+
+    calls   — обращения к stat();
+    ops     — прочие системные вызовы и байты (scandir, mkdir, move, open, bytes_read);
+    seconds — суммарное время по фазам (walk, stat, classify, date, dup_check, mkdir, move).
+    """
+    def __init__(self):
+        self.calls = 0
+        self.ops = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add(self, n: int = 1):
+        with self._lock:
+            self.calls += n
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.ops[name] += n
+
+    def spent(self, name: str, started: float):
+        """Добавить к фазе время с момента started (time.perf_counter())"""
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.seconds[name] += elapsed
+
+
+def scan_files(root: Path, counter: StatCounter | None = None, on_error=None,
+               exclude=()):
+    """Однопроходный обход через os.scandir — stat берётся из DirEntry"""
+    skip = {os.path.normcase(os.path.abspath(p)) for p in exclude}
+    stack = [os.fspath(root)]
+    while stack:
+        current = stack.pop()
+        started = time.perf_counter()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError as e:
+            if on_error:
+                on_error(current, e)
+            continue
+        finally:
+            if counter:
+                counter.count("scandir")
+                counter.spent("walk", started)
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name.startswith(SERVICE_PREFIX):
+                        continue
+                    if not skip or os.path.normcase(os.path.abspath(entry.path)) not in skip:
+                        stack.append(entry.path)
+                    continue
+                if not entry.is_file() or entry.name.startswith(SERVICE_PREFIX):
+                    continue
+                if counter:
+                    started = time.perf_counter()
+                    st = entry.stat()
+                    counter.spent("stat", started)
+                    counter.add()
+                else:
+                    st = entry.stat()
+            except OSError as e:
+                if on_error:
+                    on_error(entry.path, e)
+                continue
+            yield FileRecord(
+                Path(entry.path), st.st_size, st.st_mtime, st.st_ctime,
+                os.path.splitext(entry.name)[1].lower()
+            )
+
+
+def is_media_file(rec: FileRecord) -> bool:
+    return rec.suffix in MEDIA_EXT
+
+def is_duplicate_in_folder(rec: FileRecord, target_folder: Path,
+                           counter: StatCounter | None = None, index=None) -> bool:
+    """Только имя + размер — как в PowerShell; с index — без обращения к диску"""
+    if index is not None:
+        return index.size_of(target_folder, rec.name) == rec.size
+    if counter:
+        counter.add()
     try:
-        return target.stat().st_size == file_path.stat().st_size
-    except:
+        return os.stat(target_folder / rec.name).st_size == rec.size
+    except OSError:
         return False
 
-def safe_move_to(file_path: Path, target_folder: Path) -> Path | None:
-    target_folder.mkdir(parents=True, exist_ok=True)
-    target = target_folder / file_path.name
-    if target.exists():
-        stem, ext = target.stem, target.suffix
-        i = 1
-        while (target_folder / f"{stem}({i}){ext}").exists():
-            i += 1
-        target = target_folder / f"{stem}({i}){ext}"
+def safe_move_to(file_path: Path, target_folder: Path,
+                 counter: StatCounter | None = None,
+                 verify: bool = False, cache=None, size: int | None = None) -> Path:
+    """Перемещение в папку без затирания: занятое имя → name(1).ext, name(2).ext...
+
+    С cache (FolderCache) папка создаётся один раз, а свободное имя берётся
+    из её листинга в памяти; size — размер файла для записи в листинг.
+    Занятость имени на диске проверяет само перемещение (move_no_clobber):
+    между проверкой и переносом нет окна, и параллельный запуск не затрёт файл.
+    Ошибки перемещения не глотаются — их записывает вызывающий вместе с именем файла.
+    """
+    started = time.perf_counter()
+    if cache is not None:
+        cache.ensure_folder(target_folder)
+    else:
+        target_folder.mkdir(parents=True, exist_ok=True)
+        if counter:
+            counter.count("mkdir")
+    if counter:
+        counter.spent("mkdir", started)
+
+    stem, ext = os.path.splitext(file_path.name)
+    name, i = file_path.name, 0
+    started = time.perf_counter()
     try:
-        import shutil
-        shutil.move(str(file_path), str(target))
-        return target
-    except:
-        return None
\ No newline at end of file
+        while True:
+            if cache is not None:
+                name = cache.free_name(target_folder, file_path.name)
+            target = target_folder / name
+            try:
+                move_no_clobber(file_path, target, verify, counter)
+            except FileExistsError:
+                # Имя заняли в обход кэша (например, параллельный запуск)
+                if cache is not None:
+                    cache.add(target_folder, name, None)
+                else:
+                    i += 1
+                    name = f"{stem}({i}){ext}"
+                continue
+            if cache is not None:
+                cache.add(target_folder, name, size)
+            return target
+    finally:
+        if counter:
+            counter.count("move")
+            counter.spent("move", started)
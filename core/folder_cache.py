@@ -0,0 +1,100 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Сколько папок назначения держим в памяти; дальше вытесняются давно не нужные
+FOLDER_CACHE_SIZE = 256
+
+
+class _Listing:
+    __slots__ = ("names", "next_suffix")
+
+    def __init__(self, names):
+        self.names = names          # имя → размер (None — занято, размер неизвестен)
+        self.next_suffix = {}       # (stem, ext) → с какого (i) продолжать поиск
+
+
+class FolderCache:
+    """Содержимое папок назначения в памяти: имя → размер, с LRU-вытеснением.
+
+    Папка читается одним os.scandir при первом обращении и дальше
+    обновляется по мере перемещений, так что проверка дубликата и подбор
+    name(i).ext не ходят на диск. mkdir — один раз на папку за запуск.
+    size_of — как index для is_duplicate_in_folder.
+    """
+
+    def __init__(self, max_folders: int | None = FOLDER_CACHE_SIZE, counter=None):
+        self.max_folders = max_folders   # None — без вытеснения
+        self.counter = counter
+        self._folders = OrderedDict()
+        self._made = set()
+        self._lock = threading.Lock()
+
+    def _read(self, folder: Path) -> dict:
+        names = {}
+        stats = 0
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            stats += 1   # размер — настоящий lstat на каждый файл
+                            names[entry.name] = entry.stat(follow_symlinks=False).st_size
+                        else:
+                            names[entry.name] = None
+                    except OSError:
+                        names[entry.name] = None
+        except OSError:
+            pass   # папки ещё нет
+        if self.counter:
+            self.counter.count("scandir")
+            self.counter.add(stats)
+        return names
+
+    def _listing(self, folder: Path) -> _Listing:
+        folder = Path(folder)
+        with self._lock:
+            listing = self._folders.get(folder)
+            if listing is not None:
+                self._folders.move_to_end(folder)
+                return listing
+        # Читаем без общего замка; одну папку параллельно не трогают (замок папки у вызывающего)
+        listing = _Listing(self._read(folder))
+        with self._lock:
+            listing = self._folders.setdefault(folder, listing)
+            if self.max_folders and len(self._folders) > self.max_folders:
+                self._folders.popitem(last=False)
+        return listing
+
+    def size_of(self, folder: Path, name: str) -> int | None:
+        return self._listing(folder).names.get(name)
+
+    def contains(self, folder: Path, name: str) -> bool:
+        return name in self._listing(folder).names
+
+    def free_name(self, folder: Path, name: str) -> str:
+        """Первое свободное из name, name(1), name(2)... — без перебора с начала"""
+        listing = self._listing(folder)
+        if name not in listing.names:
+            return name
+        stem, ext = os.path.splitext(name)
+        i = listing.next_suffix.get((stem, ext), 1)
+        while f"{stem}({i}){ext}" in listing.names:
+            i += 1
+        listing.next_suffix[(stem, ext)] = i
+        return f"{stem}({i}){ext}"
+
+    def add(self, folder: Path, name: str, size: int | None):
+        self._listing(folder).names[name] = size
+
+    def ensure_folder(self, folder: Path):
+        """mkdir(parents=True) один раз на папку за время жизни кэша"""
+        folder = Path(folder)
+        if folder in self._made:
+            return
+        folder.mkdir(parents=True, exist_ok=True)
+        if self.counter:
+            self.counter.count("mkdir")
+        with self._lock:
+            self._made.add(folder)
@@ -0,0 +1,212 @@
+import heapq
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from pathlib import Path
+
+from .file_utils import SERVICE_PREFIX
+
+# Имена файлов держим в памяти до этого объёма, дальше они уходят во временный файл
+LEDGER_SPILL_BYTES = 8 * 1024 * 1024
+# Чтение сброшенных имён — блоками: соседние строки таблицы обычно рядом и в файле
+READ_BLOCK = 64 * 1024
+# Ключи сортировки для MoveLedger.order
+SORT_KEYS = ("name", "from", "to", "category", "size")
+# Сортировка по имени — кусками по столько строк; отсортированные куски
+# ложатся во временные файлы и сливаются, в памяти только один кусок
+SORT_CHUNK = 65536
+RUN_RECORD = struct.Struct("<IH")   # позиция в rows, длина ключа
+
+
+class MoveLedger:
+    """Компактный список перемещений запуска вместо списка кортежей (Path, Path).
+
+    Папки и категории интернированы: на строку — номера папок источника
+    и назначения, номер категории, размер и конец имени в общем буфере
+    имён UTF-8, то есть ~26 байт плюс само имя. Буфер имён после
+    LEDGER_SPILL_BYTES сбрасывается во временный файл. Имя в назначении
+    хранится отдельно, только если файл переименован (name(1).ext).
+    len() и ledger[i] → (src, dst) — как у прежнего списка.
+    """
+
+    def __init__(self, spill_bytes: int = LEDGER_SPILL_BYTES):
+        self.spill_bytes = spill_bytes
+        self.dirs = []            # номер → папка
+        self._dir_ids = {}
+        self.categories = []      # номер → категория (sorted, duplicates, ...)
+        self._category_ids = {}
+        self.src_dir = array("I")
+        self.dst_dir = array("I")
+        self.category = array("H")
+        self.size = array("q")
+        self._name_end = array("Q")
+        self._renamed = {}        # строка → имя в назначении, если отличается
+        self._tail = bytearray()  # ещё не сброшенные имена
+        self._spilled = 0         # сколько байт имён уже в файле
+        self._file = None
+        self._block = (0, b"")
+        self._lock = threading.Lock()
+
+    def _intern(self, table: list, ids: dict, value: str) -> int:
+        i = ids.get(value)
+        if i is None:
+            i = ids[value] = len(table)
+            table.append(value)
+        return i
+
+    def append(self, src, dst, category: str = "", size: int = 0):
+        # Пути приходят из os.rename — str уже посчитан; rpartition дешевле os.path.split
+        sdir, _, name = os.fspath(src).rpartition(os.sep)
+        ddir, _, dname = os.fspath(dst).rpartition(os.sep)
+        if dname != name:
+            self._renamed[len(self.size)] = dname
+        dirs, ids = self.dirs, self._dir_ids
+        self.src_dir.append(ids[sdir] if sdir in ids else self._intern(dirs, ids, sdir))
+        self.dst_dir.append(ids[ddir] if ddir in ids else self._intern(dirs, ids, ddir))
+        code = self._category_ids.get(category)
+        if code is None:
+            code = self._intern(self.categories, self._category_ids, category)
+        self.category.append(code)
+        self.size.append(size)
+        self._tail += name.encode("utf-8", "surrogateescape")
+        self._name_end.append(self._spilled + len(self._tail))
+        if len(self._tail) >= self.spill_bytes:
+            self._spill()
+
+    def _spill(self):
+        with self._lock:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(prefix=SERVICE_PREFIX + "ledger-")
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(self._tail)
+            self._spilled += len(self._tail)
+            self._tail = bytearray()
+
+    def _read(self, start: int, end: int) -> bytes:
+        """Байты имени из файла; имя никогда не разрезано между файлом и хвостом"""
+        with self._lock:
+            first, block = self._block
+            if not (first <= start and end <= first + len(block)):
+                self._file.flush()
+                self._file.seek(start)
+                block = self._file.read(max(READ_BLOCK, end - start))
+                self._block = (first, block) = (start, block)
+            return block[start - first:end - first]
+
+    def name(self, i: int) -> str:
+        start = self._name_end[i - 1] if i else 0
+        end = self._name_end[i]
+        if start >= self._spilled:
+            raw = self._tail[start - self._spilled:end - self._spilled]
+        else:
+            raw = self._read(start, end)
+        return bytes(raw).decode("utf-8", "surrogateescape")
+
+    def dst_name(self, i: int) -> str:
+        return self._renamed.get(i) or self.name(i)
+
+    def src(self, i: int) -> Path:
+        return Path(self.dirs[self.src_dir[i]], self.name(i))
+
+    def dst(self, i: int) -> Path:
+        return Path(self.dirs[self.dst_dir[i]], self.dst_name(i))
+
+    def category_of(self, i: int) -> str:
+        return self.categories[self.category[i]]
+
+    def __len__(self):
+        return len(self.size)
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.src(i), self.dst(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.src(i), self.dst(i)
+
+    def counts(self) -> dict:
+        """Категория → число строк"""
+        totals = [0] * len(self.categories)
+        for c in self.category:
+            totals[c] += 1
+        return dict(zip(self.categories, totals))
+
+    def select(self, category: str | None = None) -> array:
+        """Номера строк категории (None — все) — в порядке перемещения"""
+        if category is None:
+            return array("I", range(len(self)))
+        code = self._category_ids.get(category)
+        if code is None:
+            return array("I")
+        return array("I", (i for i, c in enumerate(self.category) if c == code))
+
+    def order(self, rows: array, key: str, reverse: bool = False) -> array:
+        """rows, отсортированные по колонке; сортировка устойчивая"""
+        if key == "size":
+            values = self.size
+        elif key in ("from", "to", "category"):
+            # Строки сравниваем один раз на папку/категорию, дальше — целые ранги
+            table = self.categories if key == "category" else self.dirs
+            rank = [0] * len(table)
+            for r, i in enumerate(sorted(range(len(table)), key=lambda i: table[i].lower())):
+                rank[i] = r
+            column = {"from": self.src_dir, "to": self.dst_dir, "category": self.category}[key]
+            values = [rank[c] for c in column]
+        elif key == "name":
+            return self._order_by_name(rows, reverse)
+        else:
+            raise ValueError(f"Unknown sort key: {key}")
+        return array("I", sorted(rows, key=values.__getitem__, reverse=reverse))
+
+    def _name_keys(self, rows, start: int, stop: int, reverse: bool) -> list:
+        """Отсортированные (имя в нижнем регистре, позиция) для rows[start:stop].
+
+        Позиция — вторая часть ключа, чтобы сортировка была устойчивой;
+        при обратном порядке она идёт с минусом по той же причине.
+        """
+        keys = []
+        for p in range(start, stop):
+            name = self.name(rows[p]).lower().encode("utf-8", "surrogateescape")
+            keys.append((name, -p if reverse else p))
+        keys.sort(reverse=reverse)
+        return keys
+
+    @staticmethod
+    def _read_run(fh, reverse: bool):
+        while header := fh.read(RUN_RECORD.size):
+            p, length = RUN_RECORD.unpack(header)
+            yield fh.read(length), -p if reverse else p
+
+    def _order_by_name(self, rows, reverse: bool) -> array:
+        """Внешняя сортировка слиянием: память — один кусок, а не все имена сразу"""
+        n = len(rows)
+        if n <= SORT_CHUNK:
+            return array("I", (rows[abs(p)] for _name, p in self._name_keys(rows, 0, n, reverse)))
+        runs = []
+        try:
+            for start in range(0, n, SORT_CHUNK):
+                buf = bytearray()
+                for name, p in self._name_keys(rows, start, min(n, start + SORT_CHUNK), reverse):
+                    buf += RUN_RECORD.pack(abs(p), len(name))
+                    buf += name
+                fh = tempfile.TemporaryFile(prefix=SERVICE_PREFIX + "sort-")
+                runs.append(fh)
+                fh.write(buf)
+                fh.seek(0)
+            merged = heapq.merge(*(self._read_run(fh, reverse) for fh in runs), reverse=reverse)
+            return array("I", (rows[abs(p)] for _name, p in merged))
+        finally:
+            for fh in runs:
+                fh.close()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,238 @@
+import os
+import sqlite3
+import threading
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+from .file_utils import FileRecord, SERVICE_PREFIX
+
+INDEX_NAME = SERVICE_PREFIX + "index.sqlite"
+# Сколько изменений копим до commit — индекс пишется пачками
+COMMIT_EVERY = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    folder       TEXT NOT NULL,     -- путь папки относительно MEDIA, через '/'
+    name         TEXT NOT NULL,
+    size         INTEGER NOT NULL,
+    mtime        REAL NOT NULL,
+    ctime        REAL NOT NULL,
+    partial      BLOB,              -- хеш первых/последних 64 KB
+    hash         BLOB,              -- полный хеш содержимого
+    capture_date TEXT,              -- 'YYYY-MM-DD HH:MM:SS'
+    phash        BLOB,              -- перцептивный хеш (dHash) для похожих фото
+    PRIMARY KEY (folder, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_size ON files(size);
+"""
+
+
+class LibraryIndex:
+    """Постоянный индекс MEDIA-библиотеки в SQLite рядом с её корнем.
+
+    Хранит размер, mtime, хеши и дату съёмки каждого файла: кандидаты
+    в дубликаты и их хеши берутся отсюда, а не обходом и чтением MEDIA.
+    Потокобезопасен (общий замок на соединение).
+
+    read_only — для пробного прогона: MEDIA не трогаем вовсе. Готовый
+    индекс открывается только на чтение, хеши и записи не сохраняются;
+    если индекса нет, он строится в памяти и исчезает с закрытием.
+    """
+
+    def __init__(self, media_root: Path, read_only: bool = False):
+        self.root = Path(media_root)
+        self.path = self.root / INDEX_NAME
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self.read_only = read_only and self.path.exists()
+        if self.read_only:
+            # immutable — без -wal/-shm рядом; недописанный WAL прошлого сбоя
+            # так не виден, поэтому тогда — обычное чтение (файлы уже есть)
+            wal = self.path.with_name(self.path.name + "-wal")
+            flag = "mode=ro" if wal.exists() and wal.stat().st_size else "immutable=1"
+            self._db = sqlite3.connect(f"{self.path.as_uri()}?{flag}", uri=True,
+                                       check_same_thread=False)
+            if self.is_empty():   # строить всё равно придётся — тогда уж в памяти
+                self._db.close()
+                self.read_only = False
+        if read_only and not self.read_only:
+            self._db = sqlite3.connect(":memory:", check_same_thread=False)
+            self._db.executescript(SCHEMA)
+        elif not read_only:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Индексы прошлых версий — добавить недостающие столбцы"""
+        self._columns = {row[1] for row in self._db.execute("PRAGMA table_info(files)")}
+        if "phash" not in self._columns and not self.read_only:
+            self._db.execute("ALTER TABLE files ADD COLUMN phash BLOB")
+            self._db.commit()
+            self._columns.add("phash")
+
+    # --- ключи ---
+
+    def _key(self, path: Path):
+        """(folder, name) для файла внутри MEDIA или None, если он снаружи"""
+        try:
+            rel = Path(os.path.relpath(path, self.root))
+        except ValueError:
+            return None
+        if rel.parts and rel.parts[0] == "..":
+            return None
+        return rel.parent.as_posix(), rel.name
+
+    # --- запросы ---
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def sizes(self) -> array:
+        """Различные размеры файлов библиотеки по возрастанию — прямо из индекса files_size"""
+        with self._lock:
+            return array("q", (size for (size,) in
+                               self._db.execute("SELECT DISTINCT size FROM files ORDER BY size")))
+
+    def records_of_size(self, size: int) -> list:
+        """Файлы библиотеки данного размера — запрос по индексу files_size"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT folder, name, size, mtime, ctime FROM files WHERE size=?", (size,)
+            ).fetchall()
+        return [FileRecord(self.root / folder / name, size, mtime, ctime,
+                           os.path.splitext(name)[1].lower())
+                for folder, name, size, mtime, ctime in rows]
+
+    def photo_hashes(self, suffixes):
+        """(FileRecord, phash или None) для файлов с нужными расширениями — одним запросом"""
+        with self._lock:
+            phash = "phash" if "phash" in self._columns else "NULL"   # старый индекс, только чтение
+            rows = self._db.execute(
+                f"SELECT folder, name, size, mtime, ctime, {phash} FROM files"
+            ).fetchall()
+        for folder, name, size, mtime, ctime, phash in rows:
+            suffix = os.path.splitext(name)[1].lower()
+            if suffix in suffixes:
+                yield FileRecord(self.root / folder / name, size, mtime, ctime, suffix), phash
+
+    # --- запись ---
+
+    def record(self, path: Path, rec: FileRecord, capture_date: datetime | None = None):
+        """Файл лёг в MEDIA — добавить/обновить запись"""
+        key = self._key(path)
+        if key is None or self.read_only:
+            return
+        date = capture_date.strftime("%Y-%m-%d %H:%M:%S") if capture_date else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (folder, name, size, mtime, ctime, capture_date) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, rec.size, rec.mtime, rec.ctime, date)
+            )
+            self._touch()
+
+    def forget(self, path: Path):
+        key = self._key(path)
+        if key is None or self.read_only:
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM files WHERE folder=? AND name=?", key)
+            self._touch()
+
+    def commit(self):
+        """Сбросить накопленные изменения сейчас — между пачками слежения"""
+        with self._lock:
+            self._db.commit()
+            self._dirty = 0
+
+    def _touch(self):
+        self._dirty += 1
+        if self._dirty >= COMMIT_EVERY:
+            self._db.commit()
+            self._dirty = 0
+
+    # --- кэш хешей для DuplicateIndex ---
+
+    def _get_hash(self, column, rec):
+        key = self._key(rec.path)
+        if key is None or column not in self._columns:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {column}, size, mtime FROM files WHERE folder=? AND name=?", key
+            ).fetchone()
+        if row and row[1] == rec.size and row[2] == rec.mtime:
+            return row[0]
+        return None
+
+    def _put_hash(self, column, rec, value):
+        key = self._key(rec.path)
+        if key is None or value is None or self.read_only:
+            return
+        with self._lock:
+            self._db.execute(f"UPDATE files SET {column}=? WHERE folder=? AND name=?", (value, *key))
+            self._touch()
+
+    def get_partial(self, rec):
+        return self._get_hash("partial", rec)
+
+    def put_partial(self, rec, value):
+        self._put_hash("partial", rec, value)
+
+    def get_full(self, rec):
+        return self._get_hash("hash", rec)
+
+    def put_full(self, rec, value):
+        self._put_hash("hash", rec, value)
+
+    def put_phash(self, rec, value):
+        self._put_hash("phash", rec, value)
+
+    # --- проверка / перестройка ---
+
+    def verify(self, scanned):
+        """Сверить индекс с обходом MEDIA только по size и mtime.
+
+        Новые файлы добавляются, изменённые теряют хеши и дату,
+        пропавшие удаляются. Возвращает счётчики.
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        with self._lock:
+            known = {
+                (folder, name): (size, mtime)
+                for folder, name, size, mtime in
+                self._db.execute("SELECT folder, name, size, mtime FROM files")
+            }
+        for rec in scanned:
+            key = self._key(rec.path)
+            if key is None:
+                continue
+            old = known.pop(key, None)
+            if old == (rec.size, rec.mtime):
+                counts["unchanged"] += 1
+                continue
+            counts["added" if old is None else "updated"] += 1
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO files (folder, name, size, mtime, ctime) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (*key, rec.size, rec.mtime, rec.ctime)
+                )
+                self._touch()
+        with self._lock:
+            self._db.executemany("DELETE FROM files WHERE folder=? AND name=?", list(known))
+            self._db.commit()
+            self._dirty = 0
+        counts["removed"] = len(known)
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
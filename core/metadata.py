@@ -0,0 +1,289 @@
+import re
+import struct
+from datetime import datetime, timedelta, timezone
+
+from .file_utils import FileRecord
+
+# Источники даты — как счётчики $exifCount / $nameCount / $systemCount в PS
+EXIF, NAME, SYSTEM = "exif", "name", "system"
+
+# Первое чтение заголовка; дальше — точечные чтения по смещениям
+HEAD_SIZE = 16 * 1024
+# Потолок на один блок метаданных (APP1, meta-бокс) — целиком файл не читаем
+MAX_BLOCK = 1024 * 1024
+
+JPEG_EXT = {'.jpg', '.jpeg', '.jpe', '.jfif'}
+TIFF_EXT = {'.tif', '.tiff', '.cr2', '.nef', '.nrw', '.arw', '.dng', '.orf', '.pef', '.srw'}
+HEIF_EXT = {'.heic', '.heif'}
+QT_EXT = {'.mp4', '.mov', '.m4v', '.3gp'}
+
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME = 0x0132
+TAG_ORIGINAL = 0x9003
+TAG_DIGITIZED = 0x9004
+
+QT_EPOCH = datetime(1904, 1, 1, tzinfo=timezone.utc)
+
+EXIF_DATE = re.compile(rb'(\d{4})\D?(\d{2})\D?(\d{2})\D?(\d{2})\D?(\d{2})\D?(\d{2})')
+NAME_PATTERNS = [
+    re.compile(r'IMG_(\d{4})(\d{2})(\d{2})'),
+    re.compile(r'VID_(\d{4})(\d{2})(\d{2})'),
+    re.compile(r'(\d{4})-(\d{2})-(\d{2})'),
+    re.compile(r'(\d{4})\.(\d{2})\.(\d{2})'),
+]
+
+
+class _Reader:
+    """Чтение по смещениям с кэшем первых HEAD_SIZE байт"""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.head = fh.read(HEAD_SIZE)
+        self.bytes_read = len(self.head)
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        if offset + size <= len(self.head):
+            return self.head[offset:offset + size]
+        if size > MAX_BLOCK or offset < 0:
+            return b""
+        self.fh.seek(offset)
+        data = self.fh.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def _valid(year, month, day, hour=0, minute=0, second=0, min_year=1990):
+    if not (min_year <= year <= datetime.now().year + 1):
+        return None
+    try:
+        return datetime(year, month, day, hour, minute, second)
+    except ValueError:
+        return None
+
+
+def _parse_exif_date(raw: bytes):
+    m = EXIF_DATE.search(raw)
+    return _valid(*map(int, m.groups())) if m else None
+
+
+# --- TIFF / EXIF ---
+
+def _tiff_date(read_at, base: int):
+    """DateTimeOriginal → DateTimeDigitized → DateTime из TIFF-структуры по смещению base"""
+    header = read_at(base, 8)
+    if len(header) < 8 or header[:2] not in (b"II", b"MM"):
+        return None
+    bo = "<" if header[:2] == b"II" else ">"
+    ifd0 = struct.unpack(bo + "I", header[4:8])[0]
+
+    def entries(offset):
+        count_raw = read_at(base + offset, 2)
+        if len(count_raw) < 2:
+            return {}
+        count = struct.unpack(bo + "H", count_raw)[0]
+        table = read_at(base + offset + 2, count * 12)
+        found = {}
+        for i in range(len(table) // 12):
+            tag, typ, n, value = struct.unpack(bo + "HHI4s", table[i * 12:i * 12 + 12])
+            found[tag] = (typ, n, value)
+        return found
+
+    def ascii_value(entry):
+        typ, n, value = entry
+        if typ != 2:
+            return None
+        if n <= 4:
+            return value[:n]
+        return read_at(base + struct.unpack(bo + "I", value)[0], min(n, 64))
+
+    ifd = entries(ifd0)
+    exif = {}
+    if TAG_EXIF_IFD in ifd:
+        exif = entries(struct.unpack(bo + "I", ifd[TAG_EXIF_IFD][2])[0])
+    for tags, tag in ((exif, TAG_ORIGINAL), (exif, TAG_DIGITIZED), (ifd, TAG_DATETIME)):
+        if tag in tags:
+            raw = ascii_value(tags[tag])
+            dt = _parse_exif_date(raw) if raw else None
+            if dt:
+                return dt
+    return None
+
+
+def _jpeg_date(r: _Reader):
+    if r.read_at(0, 2) != b"\xff\xd8":
+        return None
+    pos = 2
+    while True:
+        marker = r.read_at(pos, 4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            return None
+        kind, length = marker[1], struct.unpack(">H", marker[2:4])[0]
+        if kind in (0xDA, 0xD9):   # SOS / EOI — дальше только изображение
+            return None
+        if kind == 0xE1 and r.read_at(pos + 4, 6) == b"Exif\x00\x00":
+            return _tiff_date(r.read_at, pos + 10)
+        pos += 2 + length
+
+
+# --- ISO BMFF (HEIC, MP4, MOV) ---
+
+def _boxes(r: _Reader, start: int, end: int | None):
+    """(тип, начало данных, конец бокса) — прыжками по заголовкам, без чтения данных"""
+    pos = start
+    while end is None or pos + 8 <= end:
+        header = r.read_at(pos, 16)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I4s", header[:8])
+        data = pos + 8
+        if size == 1:
+            if len(header) < 16:
+                return
+            size = struct.unpack(">Q", header[8:16])[0]
+            data = pos + 16
+        elif size == 0:
+            if end is None:
+                return   # бокс до конца файла — последний
+            size = end - pos
+        if size < data - pos:
+            return
+        yield kind, data, pos + size
+        pos += size
+
+
+def _find_box(r, start, end, kind):
+    for k, data, box_end in _boxes(r, start, end):
+        if k == kind:
+            return data, box_end
+    return None
+
+
+def _uint(raw, size):
+    return int.from_bytes(raw[:size], "big") if size else 0
+
+
+def _heif_date(r: _Reader):
+    meta = _find_box(r, 0, None, b"meta")
+    if not meta:
+        return None
+    start, end = meta[0] + 4, meta[1]   # full box: version + flags
+    exif_id = None
+    iinf = _find_box(r, start, end, b"iinf")
+    if iinf:
+        version = r.read_at(iinf[0], 1)[:1]
+        skip = 4 + (2 if version == b"\x00" else 4)
+        for kind, data, _ in _boxes(r, iinf[0] + skip, iinf[1]):
+            if kind != b"infe":
+                continue
+            head = r.read_at(data, 16)
+            if head[0] == 2 and head[8:12] == b"Exif":
+                exif_id = struct.unpack(">H", head[4:6])[0]
+            elif head[0] >= 3 and head[10:14] == b"Exif":
+                exif_id = struct.unpack(">I", head[4:8])[0]
+            if exif_id is not None:
+                break
+    iloc = _find_box(r, start, end, b"iloc")
+    if exif_id is None or not iloc:
+        return None
+    raw = r.read_at(iloc[0], min(iloc[1] - iloc[0], MAX_BLOCK))
+    version = raw[0]
+    off_size, len_size = raw[4] >> 4, raw[4] & 0x0F
+    base_size, idx_size = raw[5] >> 4, (raw[5] & 0x0F) if version in (1, 2) else 0
+    pos = 6
+    if version < 2:
+        count, pos = struct.unpack(">H", raw[pos:pos + 2])[0], pos + 2
+    else:
+        count, pos = struct.unpack(">I", raw[pos:pos + 4])[0], pos + 4
+    for _ in range(count):
+        id_size = 2 if version < 2 else 4
+        item_id, pos = _uint(raw[pos:], id_size), pos + id_size
+        if version in (1, 2):
+            pos += 2          # construction_method
+        pos += 2              # data_reference_index
+        base, pos = _uint(raw[pos:], base_size), pos + base_size
+        extents, pos = struct.unpack(">H", raw[pos:pos + 2])[0], pos + 2
+        first = None
+        for _ in range(extents):
+            pos += idx_size
+            offset, pos = _uint(raw[pos:], off_size), pos + off_size
+            length, pos = _uint(raw[pos:], len_size), pos + len_size
+            if first is None:
+                first = (base + offset, length)
+        if item_id == exif_id and first:
+            offset, _ = first
+            # Exif-элемент: 4 байта смещения до TIFF-заголовка, затем "Exif\0\0"
+            skip = struct.unpack(">I", r.read_at(offset, 4))[0]
+            return _tiff_date(r.read_at, offset + 4 + skip)
+    return None
+
+
+def _quicktime_date(r: _Reader):
+    moov = _find_box(r, 0, None, b"moov")
+    if not moov:
+        return None
+    mvhd = _find_box(r, moov[0], moov[1], b"mvhd")
+    if not mvhd:
+        return None
+    raw = r.read_at(mvhd[0], 12)
+    if not raw:
+        return None
+    seconds = struct.unpack(">Q", raw[4:12])[0] if raw[0] == 1 else struct.unpack(">I", raw[4:8])[0]
+    if not seconds:
+        return None
+    dt = (QT_EPOCH + timedelta(seconds=seconds)).astimezone().replace(tzinfo=None)
+    return _valid(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+
+
+# --- публичное API ---
+
+def read_header_date(path, suffix: str, counter=None):
+    """Дата съёмки из метаданных или None; читает только нужные байты заголовка"""
+    if suffix in JPEG_EXT:
+        parser = _jpeg_date
+    elif suffix in TIFF_EXT:
+        parser = lambda r: _tiff_date(r.read_at, 0)  # noqa: E731
+    elif suffix in HEIF_EXT:
+        parser = _heif_date
+    elif suffix in QT_EXT:
+        parser = _quicktime_date
+    else:
+        return None
+    reader = None
+    try:
+        with open(path, "rb", buffering=0) as fh:
+            reader = _Reader(fh)
+            return parser(reader)
+    except (OSError, struct.error, IndexError, ValueError):
+        return None
+    finally:
+        if counter:
+            counter.count("open")
+            counter.count("bytes_read", reader.bytes_read if reader else 0)
+
+
+def date_from_name(name: str):
+    """Порт Get-DateFromFileName: YYYYMMDD в начале, затем IMG_/VID_/YYYY-MM-DD/YYYY.MM.DD"""
+    stem = name.rsplit(".", 1)[0]
+    head = stem[:8]
+    if len(head) == 8 and head.isdigit():
+        dt = _valid(int(head[:4]), int(head[4:6]), int(head[6:8]), min_year=2000)
+        if dt:
+            return dt
+    for pattern in NAME_PATTERNS:
+        m = pattern.search(stem)
+        if m:
+            dt = _valid(*map(int, m.groups()), min_year=2000)
+            if dt:
+                return dt
+    return None
+
+
+def resolve_capture_date(rec: FileRecord, counter=None):
+    """(дата, источник): EXIF → имя файла → min(ctime, mtime), как Get-FileDate"""
+    dt = read_header_date(rec.path, rec.suffix, counter)
+    if dt:
+        return dt, EXIF
+    dt = date_from_name(rec.name)
+    if dt:
+        return dt, NAME
+    return datetime.fromtimestamp(min(rec.ctime, rec.mtime)), SYSTEM
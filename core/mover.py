@@ -0,0 +1,190 @@
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import os
+import shutil
+import sys
+from pathlib import Path
+
+# Сколько байт просим у ядра за один copy_file_range / sendfile
+COPY_CHUNK = 64 * 1024 * 1024
+# Буфер для обычного read/write, когда zero-copy недоступен
+COPY_BUFFER = 8 * 1024 * 1024
+VERIFY_BUFFER = 1024 * 1024
+
+# link() не поддерживается этой ФС или запрещён — пробуем rename поверх своей заглушки
+_NO_LINK = {errno.EPERM, errno.EACCES, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK, errno.ENOSYS}
+# renameat2 из <linux/fs.h>, <fcntl.h>
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+# Ядро или ФС не умеют RENAME_NOREPLACE — тогда link + unlink
+_NO_NOREPLACE = {errno.EINVAL, errno.ENOSYS}
+
+_renameat2 = None   # функция libc, False — её нет (не Linux, старая glibc)
+
+
+def move_no_clobber(src: Path, dst: Path, verify: bool = False, counter=None):
+    """Переместить src в dst, никогда не затирая существующий dst.
+
+    Если dst уже есть — FileExistsError (вызывающий берёт следующее имя).
+    Тот же диск: на Linux — renameat2(RENAME_NOREPLACE), одна атомарная
+    операция; где её нет — os.link + unlink (атомарно занимает имя, но сбой
+    между ними оставит файл под обоими именами); на Windows — os.rename,
+    который и так не перезаписывает. Другой диск (EXDEV): zero-copy копия
+    в созданный через O_EXCL файл, fsync, по желанию сверка хешей, и только
+    потом удаление источника.
+    """
+    src, dst = os.fspath(src), os.fspath(dst)
+    if os.name == "nt":
+        try:
+            os.rename(src, dst)
+            _count(counter, "rename")
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        _copy_across(src, dst, verify, counter)
+        return
+    try:
+        if _rename_noreplace(src, dst):
+            _count(counter, "rename")
+            return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise   # в том числе FileExistsError
+        _copy_across(src, dst, verify, counter)
+        return
+    try:
+        os.link(src, dst, follow_symlinks=False)   # ссылка переносится как есть
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno == errno.EXDEV:
+            _copy_across(src, dst, verify, counter)
+            return
+        if e.errno not in _NO_LINK:
+            raise
+        _rename_reserved(src, dst, verify, counter)
+        return
+    _count(counter, "link")
+    try:
+        os.unlink(src)
+    except OSError:
+        os.unlink(dst)   # остаёмся с исходным файлом, а не с двумя именами
+        raise
+
+
+def _load_renameat2():
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fn = libc.renameat2   # glibc 2.28+
+    except (OSError, AttributeError):
+        return False
+    fn.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint)
+    fn.restype = ctypes.c_int
+    return fn
+
+
+def _rename_noreplace(src, dst) -> bool:
+    """renameat2(RENAME_NOREPLACE): True — перемещено, False — не поддерживается.
+
+    Занятый dst → FileExistsError, другие ошибки (EXDEV и т.д.) — OSError.
+    """
+    global _renameat2
+    if _renameat2 is None:
+        # Присваиваем один раз и готовое: потоки исполнителя зовут это одновременно
+        _renameat2 = _load_renameat2()
+    if not _renameat2:
+        return False
+    if _renameat2(AT_FDCWD, os.fsencode(src), AT_FDCWD, os.fsencode(dst), RENAME_NOREPLACE) == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in _NO_NOREPLACE:
+        return False
+    raise OSError(err, os.strerror(err), src, None, dst)
+
+
+def _rename_reserved(src, dst, verify, counter):
+    """Имя занимается пустой заглушкой (O_EXCL), затем rename поверх неё"""
+    os.close(os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+    try:
+        os.replace(src, dst)
+        _count(counter, "rename")
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            os.unlink(dst)
+            raise
+    _copy_across(src, dst, verify, counter, reserved=True)
+
+
+def _copy_across(src, dst, verify, counter, reserved=False):
+    flags = os.O_WRONLY | getattr(os, "O_BINARY", 0)
+    flags |= os.O_TRUNC if reserved else os.O_CREAT | os.O_EXCL
+    out = os.open(dst, flags, 0o644)
+    try:
+        try:
+            with open(src, "rb") as fin:
+                copied = _copy_data(fin.fileno(), out)
+            os.fsync(out)
+        finally:
+            os.close(out)
+        shutil.copystat(src, dst)
+        if verify and _digest(src) != _digest(dst):
+            raise OSError(errno.EIO, f"Copy verification failed: {dst}")
+    except BaseException:
+        os.unlink(dst)   # незаконченная копия — наша, её можно убрать
+        raise
+    _count(counter, "copy")
+    _count(counter, "bytes_copied", copied)
+    try:
+        os.unlink(src)
+    except OSError:
+        os.unlink(dst)
+        raise
+
+
+def _copy_data(fd_in: int, fd_out: int) -> int:
+    """copy_file_range → sendfile → read/write; возвращает число байт"""
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while n := os.copy_file_range(fd_in, fd_out, COPY_CHUNK):
+                copied += n
+            return copied
+        except OSError as e:
+            # Старые ядра не копируют между разными ФС (EXDEV) — дальше с того же места
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        try:
+            while n := os.sendfile(fd_out, fd_in, copied, COPY_CHUNK):
+                copied += n
+            return copied
+        except OSError as e:
+            if e.errno not in (errno.ENOSYS, errno.EINVAL):
+                raise
+    os.lseek(fd_in, copied, os.SEEK_SET)
+    os.lseek(fd_out, copied, os.SEEK_SET)
+    while chunk := os.read(fd_in, COPY_BUFFER):
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(fd_out, view):]
+        copied += len(chunk)
+    return copied
+
+
+def _digest(path) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        while chunk := fh.read(VERIFY_BUFFER):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _count(counter, name, n=1):
+    if counter:
+        counter.count(name, n)
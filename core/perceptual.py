@@ -0,0 +1,119 @@
+from pathlib import Path
+
+# Форматы, для которых считаем перцептивный хеш
+PHASH_EXT = {'.jpg', '.jpeg', '.png'}
+# Порог Хэмминга (из 64 бит): пересжатые и уменьшенные копии обычно укладываются в 10
+NEAR_DISTANCE = 10
+HASH_BITS = 64
+
+# Pillow и NumPy — необязательные зависимости, нужны только режиму похожих фото
+MISSING_DEPS = "Near-duplicate mode needs Pillow and NumPy: pip install pillow numpy"
+_imaging = None
+
+
+def _load():
+    global _imaging
+    if _imaging is None:
+        try:
+            import numpy
+            from PIL import Image, ImageOps
+        except ImportError as e:
+            raise RuntimeError(MISSING_DEPS) from e
+        _imaging = (numpy, Image, ImageOps)
+    return _imaging
+
+
+def available() -> bool:
+    try:
+        _load()
+        return True
+    except RuntimeError:
+        return False
+
+
+def dhash(path: Path) -> int | None:
+    """64-битный разностный хеш (dHash) или None, если файл не открывается.
+
+    JPEG декодируется сразу в уменьшенном виде (draft — масштабирование
+    в DCT), дальше 9×8 в оттенках серого и сравнение соседних пикселей.
+    """
+    np, Image, ImageOps = _load()
+    try:
+        with Image.open(path) as img:
+            img.draft("L", (64, 64))
+            img = ImageOps.exif_transpose(img).convert("L").resize((9, 8), Image.BILINEAR)
+            pixels = np.asarray(img, dtype=np.int16)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    bits = np.packbits(pixels[:, 1:] > pixels[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def to_bytes(value: int) -> bytes:
+    return value.to_bytes(HASH_BITS // 8, "big")
+
+
+def from_bytes(raw: bytes) -> int:
+    return int.from_bytes(raw, "big")
+
+
+def similarity(distance: int) -> float:
+    """Доля совпавших бит: 1.0 — одинаковые хеши"""
+    return 1 - distance / HASH_BITS
+
+
+class HammingIndex:
+    """Поиск ближайшего хеша в радиусе по Хэммингу — multi-index hashing.
+
+    64 бита делятся на CHUNKS кусков по 16 бит, для каждого куска — своя
+    таблица «значение → номера хешей». Если расстояние ≤ radius, то хотя
+    бы в одном куске оно ≤ radius // CHUNKS (принцип Дирихле), поэтому
+    кандидаты — только из корзин, отличающихся от запроса в паре бит.
+    Полное сравнение идёт лишь для них, а не для всей библиотеки.
+    """
+
+    CHUNKS = 4
+
+    def __init__(self, radius: int = NEAR_DISTANCE):
+        self.radius = radius
+        self.width = HASH_BITS // self.CHUNKS
+        self.mask = (1 << self.width) - 1
+        self.size = 0
+        self._values = []
+        self._items = []
+        self._tables = [{} for _ in range(self.CHUNKS)]
+        # Все маски ≤ radius // CHUNKS бит внутри куска — соседние корзины
+        flips = [0]
+        for _ in range(radius // self.CHUNKS):
+            flips = sorted({m | (1 << b) for m in flips for b in range(self.width)} | set(flips))
+        self._flips = flips
+
+    def _keys(self, value: int):
+        for i in range(self.CHUNKS):
+            yield self._tables[i], (value >> (i * self.width)) & self.mask
+
+    def add(self, value: int, item):
+        n = len(self._values)
+        self._values.append(value)
+        self._items.append(item)
+        for table, key in self._keys(value):
+            table.setdefault(key, []).append(n)
+        self.size += 1
+
+    def nearest(self, value: int):
+        """(расстояние, значение) ближайшего хеша в пределах radius или None"""
+        best_d, best = self.radius + 1, None
+        seen = set()
+        values = self._values
+        for table, key in self._keys(value):
+            for flip in self._flips:
+                for n in table.get(key ^ flip, ()):
+                    if n in seen:
+                        continue
+                    seen.add(n)
+                    d = (value ^ values[n]).bit_count()
+                    if d < best_d:
+                        best_d, best = d, n
+                        if d == 0:
+                            return 0, self._items[n]
+        return (best_d, self._items[best]) if best is not None else None
@@ -0,0 +1,98 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from .file_utils import FileRecord
+from .folder_cache import FolderCache
+
+PLAN_SUFFIX = "-plan.jsonl"
+PLAN_VERSION = 1
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def default_plan_path(temp_root) -> Path:
+    """Рядом с TEMP и без точки в начале: план виден в диалогах и не попадает в обход TEMP"""
+    temp = Path(temp_root).resolve()
+    folder = temp.parent if temp.parent != temp else temp   # TEMP — корень диска
+    return folder / f"{temp.name or 'temp'}{PLAN_SUFFIX}"
+
+
+class DestinationView(FolderCache):
+    """Папки назначения в памяти — для пробного прогона без перемещений.
+
+    Тот же FolderCache, но без вытеснения: запланированные имена должны
+    дожить до конца прогона. Подходит как index для is_duplicate_in_folder.
+    """
+
+    def __init__(self):
+        super().__init__(max_folders=None)
+
+    def reserve(self, rec: FileRecord, folder: Path) -> Path:
+        """Имя, которое выберет safe_move_to: name, name(1), name(2)..."""
+        name = self.free_name(folder, rec.name)
+        self.add(folder, name, rec.size)
+        return Path(folder) / name
+
+
+class PlanWriter:
+    """План перемещений в JSON Lines: строка-заголовок, затем по строке на файл.
+
+    Пишется во временный файл и подменяет целевой только при close(),
+    так что прерванный прогон не оставляет половину плана.
+    """
+
+    def __init__(self, path, mode: str, media_root: Path, temp_root: Path):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(self.path.name + ".part")
+        self._dates = {}
+        self.count = 0
+        self._fh = open(self._tmp, "w", encoding="utf-8")
+        self._write({
+            "plan": PLAN_VERSION, "mode": mode,
+            "media": str(media_root), "temp": str(temp_root),
+            "created": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    def _write(self, obj):
+        self._fh.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+    def note_date(self, target: Path, dt: datetime):
+        """Дата съёмки для файла, идущего в MEDIA, — попадёт в индекс при выполнении"""
+        self._dates[target] = dt
+
+    def add(self, key: str, rec: FileRecord, target: Path):
+        dt = self._dates.pop(target, None)
+        self._write({
+            "src": str(rec.path), "size": rec.size, "mtime": rec.mtime,
+            "key": key, "target": str(target),
+            "date": dt.strftime(DATE_FORMAT) if dt else None,
+        })
+        self.count += 1
+
+    def close(self, keep: bool = True):
+        self._fh.close()
+        if keep:
+            os.replace(self._tmp, self.path)
+        else:
+            os.unlink(self._tmp)
+
+
+def read_plan_header(path) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        header = json.loads(fh.readline())
+    if header.get("plan") != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan file: {path}")
+    return header
+
+
+def read_plan(path):
+    """Шаги плана по одному — файл не читается в память целиком"""
+    with open(path, encoding="utf-8") as fh:
+        fh.readline()
+        for line in fh:
+            if line.strip():
+                step = json.loads(line)
+                if step["date"]:
+                    step["date"] = datetime.strptime(step["date"], DATE_FORMAT)
+                yield step
@@ -0,0 +1,249 @@
+import json
+import re
+from bisect import bisect_right
+from datetime import datetime
+from pathlib import Path
+
+from .file_utils import FileRecord, MEDIA_EXT, SCREENSHOT_KEYWORDS, SMALL_FILE_LIMIT
+
+# Итог классификации, кроме имени правила: сортировать в MEDIA по дате / оставить на месте
+MEDIA, KEEP = "media", "keep"
+# target правила, который отправляет файл в MEDIA/ГГГГ/ММ, как файлы без правила
+MEDIA_TARGET = "@media"
+
+# Встроенные правила — прежнее поведение: скриншот → не медиа → <100KB медиа → MEDIA
+DEFAULT_RULES = [
+    {"name": "screenshots", "names": sorted(SCREENSHOT_KEYWORDS),
+     "target": "other/screenshots", "label": "📸 Screenshot"},
+    {"name": "other", "not_ext": sorted(MEDIA_EXT),
+     "target": "other/other_files", "label": "🗑️ Other"},
+    {"name": "compressed", "max_size": SMALL_FILE_LIMIT,
+     "target": "other/compressed", "label": "📦 <100KB"},
+]
+
+FIELDS = {"name", "names", "regex", "ext", "not_ext", "min_size", "max_size",
+          "after", "before", "target", "label"}
+# Счётчики, которые Organizer._new_results заводит всегда, кроме счётчиков правил
+RESULT_COUNTERS = ("duplicates", "sorted", "bytes_moved", "skipped",
+                   "exif", "name_date", "system_date")
+# Остальные ключи results: список перемещений, итог прогона, индекс, план, откат
+RESULT_KEYS = ("moved", "similar", "restored", "errors", "timings", "phases", "ops",
+               "stat_calls", "elapsed", "throughput", "bytes_hashed", "plan", "undo",
+               "added", "updated", "removed", "unchanged")
+# Имена, которые правило не может взять: счётчик правила лёг бы поверх ключа results
+RESERVED = {MEDIA, KEEP, *RESULT_COUNTERS, *RESULT_KEYS}
+
+
+class Rule:
+    """Одно правило: все заданные условия должны выполниться.
+
+    names     — подстроки имени без расширения (без учёта регистра);
+    regex     — регулярное выражение по полному имени файла;
+    ext / not_ext — расширения, которые подходят / не подходят;
+    min_size ≤ размер < max_size, after ≤ дата < before;
+    target    — папка: относительно TEMP или с {media}/{temp}, {year}, {month}, {ext};
+                "@media" — в MEDIA по дате съёмки, null — оставить на месте.
+
+    Дата для after/before и {year}/{month} — дата съёмки, как у сортировки
+    в MEDIA: capture_date() её отдаёт (и читает заголовок только по запросу).
+    Без capture_date — min(ctime, mtime).
+    """
+
+    __slots__ = ("name", "names", "regex", "ext", "not_ext", "min_size", "max_size",
+                 "after", "before", "target", "label")
+
+    def __init__(self, spec: dict):
+        unknown = set(spec) - FIELDS
+        name = spec.get("name")
+        if unknown or not name:
+            raise ValueError(f"Bad rule {name or spec}: unknown fields {sorted(unknown)}"
+                             if unknown else f"Rule without name: {spec}")
+        if name in RESERVED:
+            raise ValueError(f"Rule name '{name}' is reserved")
+        self.name = name
+        self.names = [kw.lower() for kw in spec.get("names", ())]
+        self.regex = re.compile(spec["regex"], re.IGNORECASE) if spec.get("regex") else None
+        self.ext = _suffixes(spec.get("ext"))
+        self.not_ext = _suffixes(spec.get("not_ext")) or frozenset()
+        self.min_size = spec.get("min_size")
+        self.max_size = spec.get("max_size")
+        self.after = _timestamp(spec.get("after"))
+        self.before = _timestamp(spec.get("before"))
+        self.target = spec.get("target")
+        self.label = spec.get("label") or f"📁 {name}"
+
+    def accepts_ext(self, suffix: str) -> bool:
+        return (self.ext is None or suffix in self.ext) and suffix not in self.not_ext
+
+    def accepts_size(self, size: int) -> bool:
+        return ((self.min_size is None or size >= self.min_size)
+                and (self.max_size is None or size < self.max_size))
+
+    def check(self, rec: FileRecord, capture_date=None) -> bool:
+        """Условия, которые не сводятся к таблицам: дата и regex"""
+        if self.after is not None or self.before is not None:
+            ts = capture_date().timestamp() if capture_date else min(rec.ctime, rec.mtime)
+            if self.after is not None and ts < self.after:
+                return False
+            if self.before is not None and ts >= self.before:
+                return False
+        return self.regex is None or self.regex.search(rec.name) is not None
+
+    def needs_date(self) -> bool:
+        """Папка зависит от даты — {year} или {month} в target"""
+        return bool(self.target) and ("{year}" in self.target or "{month}" in self.target)
+
+    def folder(self, rec: FileRecord, media_root: Path, temp_root: Path,
+               capture_date=None) -> Path:
+        target = self.target
+        if "{" in target:
+            dt = None   # без {year}/{month} дата не нужна — заголовок не читаем
+            if self.needs_date():
+                dt = capture_date() if capture_date else datetime.fromtimestamp(min(rec.ctime, rec.mtime))
+            target = target.format(year=dt and dt.year, month=dt and f"{dt.month:02d}",
+                                   ext=rec.suffix.lstrip(".") or "noext",
+                                   media=media_root, temp=temp_root)
+        return temp_root / target   # абсолютный target pathlib оставит как есть
+
+
+def _suffixes(values):
+    if values is None:
+        return None
+    return frozenset(v.lower() if v.startswith(".") else "." + v.lower() for v in values)
+
+
+def _timestamp(text):
+    return datetime.fromisoformat(text).timestamp() if text else None
+
+
+class RuleSet:
+    """Правила, скомпилированные один раз: порядок важен, выигрывает первое.
+
+    Каждое правило — бит в маске. Расширение и размер дают готовые маски
+    из таблиц (dict по расширению, bisect по границам размеров), подстроки
+    всех правил собраны в одно регулярное выражение. На файл — пара
+    поисков в таблицах и один re.finditer вместо цикла по правилам;
+    дата и regex проверяются только у правил, переживших маски.
+    """
+
+    def __init__(self, specs=None):
+        self.rules = [Rule(spec) for spec in (DEFAULT_RULES if specs is None else specs)]
+        names = [r.name for r in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Rule names must be unique")
+        self.by_name = {r.name: r for r in self.rules}
+        bits = [1 << i for i in range(len(self.rules))]
+
+        # Расширения: все упомянутые — в таблицу, остальные — маска по умолчанию
+        mentioned = set()
+        for r in self.rules:
+            mentioned |= (r.ext or set()) | r.not_ext
+        self._ext = {s: self._mask(bits, lambda r: r.accepts_ext(s)) for s in mentioned}
+        self._ext_default = self._mask(bits, lambda r: r.ext is None)
+
+        # Размеры: интервалы между границами всех правил
+        self._bounds = sorted({b for r in self.rules for b in (r.min_size, r.max_size) if b is not None})
+        starts = [0] + self._bounds
+        self._sizes = [self._mask(bits, lambda r: r.accepts_size(s)) for s in starts]
+
+        # Подстроки: одно выражение, длинные варианты первыми. В позиции
+        # находится самая длинная подстрока, а все короче, совпавшие там же, —
+        # её префиксы, поэтому маска подстроки включает правила её префиксов.
+        keywords = {}
+        for bit, r in zip(bits, self.rules):
+            for kw in r.names:
+                keywords[kw] = keywords.get(kw, 0) | bit
+        self._keywords = {
+            kw: self._mask_of(keywords, kw) for kw in keywords
+        }
+        self._named = self._mask(bits, lambda r: bool(r.names))
+        alternatives = "|".join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True))
+        # Простой search отсекает имена без подстрок; finditer — только для совпавших
+        self._any = re.compile(alternatives).search if keywords else None
+        self._matcher = re.compile("(?=(" + alternatives + "))").finditer if keywords else None
+        self._checked = self._mask(bits, lambda r: r.regex is not None
+                                   or r.after is not None or r.before is not None)
+        # regex всех правил — тоже одним выражением: не нашлось ничего — гасим
+        # их биты разом; нашлось — уточняем поштучно в Rule.check
+        self._regexed = self._mask(bits, lambda r: r.regex is not None)
+        self._any_regex = None
+        if self._regexed:
+            try:
+                self._any_regex = re.compile("|".join(
+                    f"(?:{r.regex.pattern})" for r in self.rules if r.regex
+                ), re.IGNORECASE).search
+            except re.error:
+                pass   # обратные ссылки и т.п. не склеиваются — останется проверка по одному
+
+    def _mask(self, bits, test) -> int:
+        mask = 0
+        for bit, r in zip(bits, self.rules):
+            if test(r):
+                mask |= bit
+        return mask
+
+    @staticmethod
+    def _mask_of(keywords, kw) -> int:
+        mask = 0
+        for other, bits in keywords.items():
+            if kw.startswith(other):
+                mask |= bits
+        return mask
+
+    def _name_mask(self, stem: str) -> int:
+        mask = 0
+        if self._any(stem) is None:
+            return mask
+        for m in self._matcher(stem):
+            mask |= self._keywords[m.group(1)]
+        return mask
+
+    def match(self, rec: FileRecord, capture_date=None) -> Rule | None:
+        """Первое подходящее правило или None; capture_date — см. Rule"""
+        suffix = rec.suffix
+        mask = self._ext.get(suffix, self._ext_default) & self._sizes[bisect_right(self._bounds, rec.size)]
+        if not mask:
+            return None
+        name = rec.path.name   # имя берём один раз — stem из него же, без pathlib
+        if mask & self._named:
+            stem = name[:-len(suffix)] if suffix else name
+            mask &= ~self._named | self._name_mask(stem.lower())
+        if mask & self._regexed and self._any_regex and self._any_regex(name) is None:
+            mask &= ~self._regexed
+        while mask:
+            low = mask & -mask
+            rule = self.rules[low.bit_length() - 1]
+            if not low & self._checked or rule.check(rec, capture_date):
+                return rule
+            mask ^= low
+        return None
+
+    def classify(self, rec: FileRecord, capture_date=None) -> str:
+        """Имя правила, MEDIA (сортировать по дате) или KEEP (не трогать)"""
+        rule = self.match(rec, capture_date)
+        if rule is None or rule.target == MEDIA_TARGET:
+            return MEDIA
+        return rule.name if rule.target else KEEP
+
+
+def load_rules(path) -> RuleSet:
+    """Правила из JSON: список правил или {"rules": [...]}"""
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if isinstance(data, dict):
+        data = data.get("rules", [])
+    return RuleSet(data)
+
+
+DEFAULT_RULESET = RuleSet()
+
+
+def as_ruleset(rules) -> RuleSet:
+    """Путь к JSON, список правил, готовый RuleSet или None — встроенные"""
+    if rules is None:
+        return DEFAULT_RULESET
+    if isinstance(rules, RuleSet):
+        return rules
+    if isinstance(rules, (list, tuple)):
+        return RuleSet(rules)
+    return load_rules(rules)
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from .file_utils import FileRecord, SERVICE_PREFIX
+
+JOURNAL_NAME = SERVICE_PREFIX + "journal.sqlite"
+# pending-записи копим пачкой: файл, ушедший из TEMP, повторно не найдётся
+COMMIT_EVERY = 256
+
+KEEP, PENDING, MOVED = "keep", "pending", "moved"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    path     TEXT NOT NULL,     -- относительно TEMP
+    mode     TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime    REAL NOT NULL,
+    decision TEXT NOT NULL,     -- keep | pending | moved
+    target   TEXT,              -- папка (pending) или файл (moved)
+    PRIMARY KEY (path, mode)
+) WITHOUT ROWID;
+"""
+
+
+class RunJournal:
+    """Журнал решений по файлам TEMP между запусками.
+
+    keep    — файл осмотрен и оставлен на месте: при тех же size/mtime
+              повторный запуск того же режима его пропускает;
+    pending — перемещение начато; после сбоя файл, оставшийся в TEMP,
+              обрабатывается заново, а ушедший уже не будет найден;
+    moved   — перемещение завершено (хранится до следующего запуска).
+
+    Файлы, уже разобранные в этом запуске и оставленные в TEMP, держатся
+    в памяти (held): при слежении повторное событие по такому файлу с теми
+    же size/mtime его заново не поднимает.
+    """
+
+    def __init__(self, temp_root: Path):
+        self.root = Path(temp_root)
+        self.path = self.root / JOURNAL_NAME
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._kept = {}
+        self._held = {}   # путь → (size, mtime): оставлен в этом запуске
+
+    def _rel(self, path: Path) -> str:
+        return Path(os.path.relpath(path, self.root)).as_posix()
+
+    def recover(self) -> dict:
+        """Разобрать pending после прерванного запуска, забыть прошлые moved"""
+        counts = {"completed": 0, "retried": 0}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path FROM decisions WHERE decision=?", (PENDING,)
+            ).fetchall()
+            for (rel,) in rows:
+                # Файл на месте — перемещение не состоялось и будет повторено;
+                # файла нет — он уже ушёл из TEMP и второй раз не найдётся
+                counts["retried" if (self.root / rel).exists() else "completed"] += 1
+            self._db.execute("DELETE FROM decisions WHERE decision<>?", (KEEP,))
+            self._db.commit()
+        return counts
+
+    def load(self, mode: str):
+        """Прочитать решения keep для режима — дальше проверки идут в памяти"""
+        with self._lock:
+            self._kept = {
+                rel: (size, mtime) for rel, size, mtime in self._db.execute(
+                    "SELECT path, size, mtime FROM decisions WHERE mode=? AND decision=?",
+                    (mode, KEEP)
+                )
+            }
+
+    def is_unchanged(self, rec: FileRecord) -> bool:
+        return self._kept.pop(self._rel(rec.path), None) == (rec.size, rec.mtime)
+
+    def _write(self, rec, mode, decision, target=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO decisions (path, mode, size, mtime, decision, target) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self._rel(rec.path), mode, rec.size, rec.mtime, decision,
+                 str(target) if target else None)
+            )
+            self._dirty += 1
+            if self._dirty >= COMMIT_EVERY:
+                self._db.commit()
+                self._dirty = 0
+
+    def keep(self, rec: FileRecord, mode: str):
+        self._write(rec, mode, KEEP)
+        self.hold(rec)
+
+    def hold(self, rec: FileRecord):
+        """Не трогать файл до конца запуска, пока он не изменится — только в памяти.
+
+        Так держатся и файлы, чьё перемещение не удалось: в базе у них
+        остаётся pending, и следующий запуск попробует снова.
+        """
+        self._held[self._rel(rec.path)] = (rec.size, rec.mtime)
+
+    def is_held(self, rec: FileRecord) -> bool:
+        return self._held.get(self._rel(rec.path)) == (rec.size, rec.mtime)
+
+    def begin(self, rec: FileRecord, mode: str, folder: Path):
+        self._write(rec, mode, PENDING, folder)
+
+    def done(self, rec: FileRecord, mode: str, target: Path):
+        self._write(rec, mode, MOVED, target)
+
+    def forget_unseen(self, mode: str):
+        """Полный проход завершён — keep-записи исчезнувших файлов больше не нужны"""
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM decisions WHERE path=? AND mode=?",
+                ((rel, mode) for rel in self._kept)
+            )
+            self._kept = {}
+
+    def commit(self):
+        """Сбросить накопленные решения сейчас — между пачками слежения"""
+        with self._lock:
+            self._db.commit()
+            self._dirty = 0
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .file_utils import SERVICE_PREFIX
+
+UNDO_DIR = SERVICE_PREFIX + "undo"
+UNDO_VERSION = 1
+# fsync не на каждую строку: раз в FSYNC_EVERY перемещений или FSYNC_INTERVAL секунд
+FSYNC_EVERY = 512
+FSYNC_INTERVAL = 1.0
+# Журнал, по которому уже откатились, переименовывается с этим суффиксом
+ROLLED_BACK = ".rolledback"
+
+
+class UndoLog:
+    """Журнал перемещений запуска для отката: JSON Lines в TEMP/.pvo_undo/.
+
+    Первая строка — заголовок (режим, папки, время), дальше по строке
+    {"src", "dst"} на каждое завершённое перемещение. Записи копятся
+    в буфере и сбрасываются на диск с fsync пачками. append зовут потоки
+    исполнителя сразу после перемещения — запись под замком.
+    """
+
+    def __init__(self, temp_root: Path, mode: str, media_root: Path):
+        folder = Path(temp_root) / UNDO_DIR
+        folder.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.path = folder / f"{stamp}-{mode}.jsonl"
+        i = 1
+        while self.path.exists():
+            i += 1
+            self.path = folder / f"{stamp}-{mode}-{i}.jsonl"
+        self.count = 0
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._fh = open(self.path, "w", encoding="utf-8")
+        self._write({
+            "undo": UNDO_VERSION, "mode": mode,
+            "media": str(media_root), "temp": str(temp_root),
+            "started": datetime.now().isoformat(timespec="seconds"),
+        })
+        self._sync()
+
+    def _write(self, obj):
+        self._fh.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+    def _sync(self):
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def append(self, src: Path, dst: Path):
+        line = json.dumps({"src": str(src), "dst": str(dst)}, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._fh.write(line)
+            self.count += 1
+            self._unsynced += 1
+            if self._unsynced >= FSYNC_EVERY or time.monotonic() - self._synced_at >= FSYNC_INTERVAL:
+                self._sync()
+
+    def flush(self):
+        """Всё записанное — на диск, не дожидаясь пачки (долгое слежение)"""
+        with self._lock:
+            if self._unsynced:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._fh.close()
+        if not self.count:
+            os.unlink(self.path)   # пустой журнал откатывать нечего
+
+
+def read_undo_header(path) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        header = json.loads(fh.readline())
+    if header.get("undo") != UNDO_VERSION:
+        raise ValueError(f"Unsupported undo log: {path}")
+    return header
+
+
+def read_undo(path) -> list:
+    """Перемещения журнала в обратном порядке; оборванная последняя строка пропускается"""
+    moves = []
+    with open(path, encoding="utf-8") as fh:
+        fh.readline()
+        for line in fh:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break   # запись, не дожившая до fsync
+            moves.append((Path(entry["src"]), Path(entry["dst"])))
+    moves.reverse()
+    return moves
+
+
+def latest_undo_log(temp_root: Path) -> Path | None:
+    """Последний ещё не откаченный журнал в TEMP"""
+    folder = Path(temp_root) / UNDO_DIR
+    try:
+        logs = sorted(folder.glob("*.jsonl"), key=lambda p: p.stat().st_mtime)
+    except OSError:
+        return None
+    return logs[-1] if logs else None
+
+
+def mark_rolled_back(path: Path) -> Path:
+    done = path.with_name(path.name + ROLLED_BACK)
+    os.replace(path, done)
+    return done
@@ -0,0 +1,264 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import sys
+import time
+from pathlib import Path
+
+from .file_utils import FileRecord, SERVICE_PREFIX
+
+# Файл считается дописанным, если его не меняли (mtime и ctime) столько секунд
+WATCH_QUIET = 2.0
+# Сколько готовых файлов обрабатывается одной микропачкой
+WATCH_BATCH = 256
+# Дольше не спим — чтобы вовремя заметить stop()
+WAKE_INTERVAL = 1.0
+# Просыпаемся чуть позже ближайшего срока — соседние файлы попадут в ту же пачку
+GATHER = 0.25
+# Запасной режим без inotify: как часто сверять mtime папок
+POLL_INTERVAL = 2.0
+
+# Маски inotify из <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+WATCH_MASK = IN_CREATE | IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO
+EVENT = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+def _excluded(path: str, skip) -> bool:
+    return os.path.basename(path).startswith(SERVICE_PREFIX) or \
+        os.path.normcase(os.path.abspath(path)) in skip
+
+
+class InotifyWatcher:
+    """События файловой системы через inotify (ctypes, без зависимостей).
+
+    Наблюдение рекурсивное: на каждую папку TEMP — свой watch, новые
+    папки подхватываются по IN_CREATE|IN_ISDIR вместе с тем, что в них
+    успели положить. Исключённые папки (куда раскладываем) не наблюдаются.
+    """
+
+    kind = "inotify"
+
+    def __init__(self, root: Path, exclude=()):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.root = os.fspath(root)
+        self._skip = {os.path.normcase(os.path.abspath(p)) for p in exclude}
+        self._dirs = {}   # wd → папка
+        self.overflowed = False
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            self.initial = self._add_tree(self.root)   # то, что лежало до старта
+        except OSError:
+            os.close(self.fd)
+            raise
+        self._poll = select.poll()
+        self._poll.register(self.fd, select.POLLIN)
+
+    def _add_tree(self, top: str) -> list:
+        """Поставить watch на папку и всё под ней; вернуть уже лежащие там файлы"""
+        files = []
+        stack = [top]
+        while stack:
+            folder = stack.pop()
+            wd = self._add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if folder == top and not self._dirs:
+                    raise OSError(err, f"inotify_add_watch failed: {os.strerror(err)}", folder)
+                continue   # папку уже убрали или кончился лимит watch — не страшно
+            self._dirs[wd] = folder
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not _excluded(entry.path, self._skip):
+                                stack.append(entry.path)
+                        elif not entry.name.startswith(SERVICE_PREFIX):
+                            files.append(Path(entry.path))
+            except OSError:
+                pass
+        return files
+
+    def wait(self, timeout: float) -> list:
+        """Пути файлов, о которых пришли события за время ожидания"""
+        if not self._poll.poll(max(0, int(timeout * 1000))):
+            return []
+        touched = []
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = EVENT.unpack_from(data, offset)
+                offset += EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed = True   # события потеряны — нужен один обход
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                folder = self._dirs.get(wd)
+                if folder is None or not name:
+                    continue
+                path = os.path.join(folder, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not _excluded(path, self._skip):
+                        touched.extend(self._add_tree(path))
+                elif not name.startswith(SERVICE_PREFIX.encode()):
+                    touched.append(Path(path))
+        return touched
+
+    def rescan(self) -> list:
+        """После переполнения очереди: один обход, watch на новые папки"""
+        self.overflowed = False
+        return self._add_tree(self.root)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Запасной вариант без inotify: stat папок, не файлов.
+
+    Новый файл меняет mtime своей папки — перечитываются только такие
+    папки, и наружу отдаются лишь новые имена. Полного обхода TEMP нет.
+    """
+
+    kind = "polling"
+
+    def __init__(self, root: Path, exclude=(), interval: float = POLL_INTERVAL):
+        self.interval = interval
+        self._skip = {os.path.normcase(os.path.abspath(p)) for p in exclude}
+        self._dirs = {}   # папка → (mtime_ns, имена файлов)
+        self.overflowed = False
+        self._due = time.monotonic() + interval
+        self.initial = self._scan(os.fspath(root))
+
+    def _scan(self, folder: str) -> list:
+        """Перечитать папку; новые подпапки — целиком; вернуть новые файлы"""
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+            with os.scandir(folder) as it:
+                entries = list(it)
+        except OSError:
+            self._dirs.pop(folder, None)
+            return []
+        known = self._dirs[folder][1] if folder in self._dirs else None
+        names, fresh = set(), []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.path not in self._dirs and not _excluded(entry.path, self._skip):
+                    fresh.extend(self._scan(entry.path))
+            elif not entry.name.startswith(SERVICE_PREFIX):
+                names.add(entry.name)
+                if known is not None and entry.name not in known:
+                    fresh.append(Path(entry.path))
+        self._dirs[folder] = (mtime, names)
+        if known is None:   # новая папка: всё в ней — новое
+            fresh.extend(Path(folder, name) for name in names)
+        return fresh
+
+    def wait(self, timeout: float) -> list:
+        pause = min(timeout, self._due - time.monotonic())
+        if pause > 0:
+            time.sleep(pause)
+        if time.monotonic() < self._due:
+            return []
+        self._due = time.monotonic() + self.interval
+        touched = []
+        for folder, (mtime, _names) in list(self._dirs.items()):
+            try:
+                changed = os.stat(folder).st_mtime_ns != mtime
+            except OSError:
+                self._dirs.pop(folder, None)
+                continue
+            if changed:
+                touched.extend(self._scan(folder))
+        return touched
+
+    def close(self):
+        self._dirs.clear()
+
+
+def open_watcher(root: Path, exclude=(), polling: bool = False):
+    """inotify на Linux, иначе (или если не вышло) — опрос mtime папок"""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, exclude)
+        except (OSError, AttributeError):
+            pass   # нет inotify в libc или исчерпан лимит — опрос тоже справится
+    return PollingWatcher(root, exclude)
+
+
+class QuietFiles:
+    """Файлы, ждущие «затишья»: обрабатываем, когда запись точно закончилась.
+
+    Событие откладывает проверку на quiet секунд. При проверке файл
+    готов, если ни mtime, ни ctime (его не подделать через utime) не
+    менялись последние quiet секунд; иначе ждём остаток срока.
+    """
+
+    def __init__(self, quiet: float = WATCH_QUIET):
+        self.quiet = quiet
+        self._due = {}   # путь → monotonic-время проверки
+
+    @property
+    def pending(self) -> int:
+        return len(self._due)
+
+    def touch(self, path: Path, now: float, delay: float | None = None):
+        self._due[path] = now + (self.quiet if delay is None else delay)
+
+    def timeout(self, now: float, default: float) -> float:
+        """Сколько можно спать до ближайшей проверки"""
+        if not self._due:
+            return default
+        return max(0.0, min(default, min(self._due.values()) + GATHER - now))
+
+    def ready(self, now: float, counter=None, limit: int = WATCH_BATCH) -> list:
+        """Записи файлов, которые уже не меняются; не больше limit за раз"""
+        out = []
+        wall = time.time()
+        for path, due in list(self._due.items()):
+            if due > now + GATHER:
+                continue
+            if counter:
+                counter.add()
+            try:
+                st = os.stat(path, follow_symlinks=False)
+            except OSError:
+                del self._due[path]   # удалён или уже перемещён
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                del self._due[path]
+                continue
+            idle = wall - max(st.st_mtime, st.st_ctime)
+            if idle < self.quiet:
+                self._due[path] = now + self.quiet - idle
+                continue
+            del self._due[path]
+            out.append(FileRecord(path, st.st_size, st.st_mtime, st.st_ctime, path.suffix.lower()))
+            if len(out) >= limit:
+                break
+        return out
@@ -1,6 +1,6 @@
 ﻿import sys, os
+import multiprocessing
 from PySide6.QtWidgets import QApplication
-from ui.main_window import MainWindow
 
 def resource_path(relative_path):
     try:
@@ -9,11 +9,19 @@ def resource_path(relative_path):
         base_path = os.path.dirname(__file__)
     return os.path.join(base_path, relative_path)
 
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
+def create_window(argv):
+    """Приложение с общим стилем и главное окно — этот же путь мерит bench_startup"""
+    app = QApplication(argv)
+    # Весь стиль — одна таблица на приложение, виджеты своих setStyleSheet не вызывают
     style_path = resource_path('assets/style.qss')
     if os.path.exists(style_path):
         with open(style_path, 'r', encoding='utf-8') as f:
             app.setStyleSheet(f.read())
-    w = MainWindow(); w.show()
+    from ui.main_window import MainWindow   # после QApplication: окно — главный импорт
+    return app, MainWindow()
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()  # пул процессов в собранном exe
+    app, w = create_window(sys.argv)
+    w.show()
     sys.exit(app.exec())
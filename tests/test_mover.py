@@ -0,0 +1,123 @@
+"""move_no_clobber: занятое имя не затирается ни на одном из путей переноса"""
+import errno
+import os
+
+import pytest
+
+from core import mover
+from core.file_utils import StatCounter
+
+
+def make(path, data=b"data"):
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def no_renameat2(monkeypatch):
+    """Как на ядре/ФС без RENAME_NOREPLACE — путь link + unlink"""
+    monkeypatch.setattr(mover, "_rename_noreplace", lambda src, dst: False)
+
+
+@pytest.fixture
+def no_link(monkeypatch, no_renameat2):
+    """ФС без жёстких ссылок — путь через заглушку O_EXCL"""
+    def link(src, dst, follow_symlinks=True):
+        raise OSError(errno.EPERM, "Operation not permitted")
+    monkeypatch.setattr(mover.os, "link", link)
+
+
+@pytest.fixture
+def cross_device(monkeypatch):
+    """Источник и назначение на разных дисках"""
+    def exdev(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link", src, None, dst)
+    monkeypatch.setattr(mover, "_rename_noreplace", exdev)
+
+
+def test_moves_file(tmp_path):
+    src = make(tmp_path / "a.jpg")
+    dst = tmp_path / "sub" / "a.jpg"
+    dst.parent.mkdir()
+    mover.move_no_clobber(src, dst)
+    assert not src.exists()
+    assert dst.read_bytes() == b"data"
+
+
+@pytest.mark.parametrize("path", ["renameat2", "link"])
+def test_existing_target_is_kept(tmp_path, request, path):
+    if path == "link":
+        request.getfixturevalue("no_renameat2")
+    src = make(tmp_path / "a.jpg", b"new")
+    dst = make(tmp_path / "b.jpg", b"old")
+    with pytest.raises(FileExistsError):
+        mover.move_no_clobber(src, dst)
+    assert src.read_bytes() == b"new"
+    assert dst.read_bytes() == b"old"
+
+
+def test_without_links_uses_reserved_name(tmp_path, no_link):
+    src = make(tmp_path / "a.jpg")
+    dst = tmp_path / "b.jpg"
+    counter = StatCounter()
+    mover.move_no_clobber(src, dst, counter=counter)
+    assert not src.exists()
+    assert dst.read_bytes() == b"data"
+    assert counter.ops["rename"] == 1
+
+
+def test_without_links_existing_target_is_kept(tmp_path, no_link):
+    src = make(tmp_path / "a.jpg", b"new")
+    dst = make(tmp_path / "b.jpg", b"old")
+    with pytest.raises(FileExistsError):
+        mover.move_no_clobber(src, dst)
+    assert src.read_bytes() == b"new"
+    assert dst.read_bytes() == b"old"
+
+
+def test_without_links_failed_rename_drops_placeholder(tmp_path, no_link, monkeypatch):
+    src = make(tmp_path / "a.jpg")
+    dst = tmp_path / "b.jpg"
+
+    def replace(src, dst):
+        raise OSError(errno.EACCES, "Permission denied")
+    monkeypatch.setattr(mover.os, "replace", replace)
+    with pytest.raises(PermissionError):
+        mover.move_no_clobber(src, dst)
+    assert src.exists()
+    assert not dst.exists()
+
+
+def test_cross_device_copy_is_verified(tmp_path, cross_device):
+    data = os.urandom(3 * mover.VERIFY_BUFFER + 17)
+    src = make(tmp_path / "a.mov", data)
+    dst = tmp_path / "b.mov"
+    os.utime(src, (1_600_000_000, 1_600_000_000))
+    counter = StatCounter()
+    mover.move_no_clobber(src, dst, verify=True, counter=counter)
+    assert not src.exists()
+    assert dst.read_bytes() == data
+    assert dst.stat().st_mtime == 1_600_000_000
+    assert counter.ops["copy"] == 1
+    assert counter.ops["bytes_copied"] == len(data)
+
+
+def test_cross_device_bad_copy_keeps_source(tmp_path, cross_device, monkeypatch):
+    src = make(tmp_path / "a.mov")
+    dst = tmp_path / "b.mov"
+    digests = iter([b"source", b"copy"])
+    monkeypatch.setattr(mover, "_digest", lambda path: next(digests))
+    with pytest.raises(OSError) as err:
+        mover.move_no_clobber(src, dst, verify=True)
+    assert err.value.errno == errno.EIO
+    assert src.read_bytes() == b"data"
+    assert not dst.exists()
+
+
+def test_cross_device_existing_target_is_kept(tmp_path, cross_device):
+    src = make(tmp_path / "a.mov", b"new")
+    dst = make(tmp_path / "b.mov", b"old")
+    with pytest.raises(FileExistsError):
+        mover.move_no_clobber(src, dst, verify=True)
+    assert src.read_bytes() == b"new"
+    assert dst.read_bytes() == b"old"
@@ -1,21 +1,37 @@
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QFileDialog, QGridLayout, QHBoxLayout,
-    QMessageBox, QLabel  # ← QLabel теперь импортирован!
+    QMessageBox, QPlainTextEdit
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 from ui.widgets import (
     AnimatedButton, AnimatedProgressBar, CircleButton,
-    InfoButton, IconCircleButton
+    InfoButton, IconCircleButton, install_shadows, set_state
 )
-import webbrowser
-from core.workers import ScannerWorker
+from pathlib import Path
+
+# Сколько последних строк держит лог — старые вытесняются, как в кольцевом буфере;
+# столько же строк копит между пачками и воркер
+LOG_LINES = 2000
+# Свои правила сортировки — rules.json рядом с программой (формат: rules.example.json)
+RULES_FILE = Path(__file__).resolve().parent.parent / "rules.json"
+
+
+def make_worker(*args, **kwargs):
+    # Движок (sqlite, ctypes, пулы) грузится при первом запуске, а не при открытии окна
+    from core.workers import ScannerWorker
+    return ScannerWorker(*args, log_lines=LOG_LINES, **kwargs)
+
+
+def open_url(url):
+    import webbrowser
+    webbrowser.open(url)
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Photo & Video Organizer")
         self.setMinimumSize(1200, 750)
-        self.setStyleSheet("background-color: #101010;")
+        self._painted = False
         self.media_path = None
         self.temp_path = None
 
@@ -39,20 +55,11 @@ class MainWindow(QMainWindow):
             circle_layout.addWidget(btn)
         main.addLayout(circle_layout, 0, 0, 1, 3, alignment=Qt.AlignLeft)
 
-        # Info screen
-        self.info_screen = QLabel("Status: waiting for input...")
-        self.info_screen.setStyleSheet("""
-            QLabel {
-                background-color: #1A1A1A;
-                color: white;
-                border: 2px solid #2E2E2E;
-                border-radius: 16px;
-                padding: 18px;
-                font-size: 17px;
-            }
-        """)
+        # Info screen — только дописывание в конец, без перерисовки всего текста
+        self.info_screen = QPlainTextEdit("Status: waiting for input...")
+        self.info_screen.setReadOnly(True)
+        self.info_screen.setMaximumBlockCount(LOG_LINES)
         self.info_screen.setMinimumHeight(350)
-        self.info_screen.setAlignment(Qt.AlignTop | Qt.AlignLeft)
         main.addWidget(self.info_screen, 1, 0, 1, 4)
 
         # Mode buttons
@@ -66,10 +73,42 @@ class MainWindow(QMainWindow):
         self.btn_mode_trash.clicked.connect(lambda: self.set_mode("trash"))
         mode_layout.addWidget(self.btn_mode_full)
         mode_layout.addWidget(self.btn_mode_dupes)
+        self.btn_mode_index = AnimatedButton("Verify Index")
+        self.btn_mode_index.clicked.connect(lambda: self.set_mode("index"))
+        self.btn_mode_similar = AnimatedButton("Find Similar")
+        self.btn_mode_similar.clicked.connect(lambda: self.set_mode("similar"))
         mode_layout.addWidget(self.btn_mode_trash)
+        mode_layout.addWidget(self.btn_mode_similar)
+        mode_layout.addWidget(self.btn_mode_index)
+        self.btn_streaming = AnimatedButton("Streaming: OFF")
+        self.btn_streaming.setCheckable(True)
+        self.btn_streaming.toggled.connect(
+            lambda on: self.btn_streaming.setText(f"Streaming: {'ON' if on else 'OFF'}")
+        )
+        mode_layout.addWidget(self.btn_streaming)
+        self.btn_watch = AnimatedButton("Watch: OFF")
+        self.btn_watch.setCheckable(True)
+        self.btn_watch.toggled.connect(
+            lambda on: self.btn_watch.setText(f"Watch: {'ON' if on else 'OFF'}")
+        )
+        mode_layout.addWidget(self.btn_watch)
+        self.btn_dry_run = AnimatedButton("Dry Run: OFF")
+        self.btn_dry_run.setCheckable(True)
+        self.btn_dry_run.toggled.connect(
+            lambda on: self.btn_dry_run.setText(f"Dry Run: {'ON' if on else 'OFF'}")
+        )
+        mode_layout.addWidget(self.btn_dry_run)
+        self.btn_run_plan = AnimatedButton("Run Plan")
+        self.btn_run_plan.clicked.connect(self.run_plan)
+        mode_layout.addWidget(self.btn_run_plan)
+        self.btn_undo = AnimatedButton("Undo Last Run")
+        self.btn_undo.clicked.connect(self.undo_last_run)
+        mode_layout.addWidget(self.btn_undo)
         main.addLayout(mode_layout, 2, 0, 1, 4)
 
         self.current_mode = None
+        self.watching = False
+        self.moved = None   # MoveLedger последнего запуска
 
         # Folder selection
         folder_layout = QHBoxLayout()
@@ -93,14 +132,33 @@ class MainWindow(QMainWindow):
         main.addWidget(self.progress, 5, 0, 1, 4)
 
         # Footer buttons
+        self.btn_results = AnimatedButton("Show Results")
+        self.btn_results.clicked.connect(self.show_results)
+        self.btn_results.setEnabled(False)
+        main.addWidget(self.btn_results, 6, 0)
+
         self.btn_github = IconCircleButton("G", "#6C5CE7")
-        self.btn_github.mousePressEvent = lambda e: webbrowser.open("https://github.com/keks84725/Photo-Video-Organizer")
+        self.btn_github.mousePressEvent = lambda e: open_url("https://github.com/keks84725/Photo-Video-Organizer")
         main.addWidget(self.btn_github, 6, 2, alignment=Qt.AlignRight)
 
         self.btn_donate = IconCircleButton("❤", "#FF4F4F")
-        self.btn_donate.mousePressEvent = lambda e: webbrowser.open("https://www.donationalerts.com/r/keks84725")
+        self.btn_donate.mousePressEvent = lambda e: open_url("https://www.donationalerts.com/r/keks84725")
         main.addWidget(self.btn_donate, 6, 3, alignment=Qt.AlignRight)
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            # Тени — после первой отрисовки: окно появляется сразу, эффекты чуть позже
+            self._painted = True
+            QTimer.singleShot(0, lambda: install_shadows(self))
+
+    def closeEvent(self, event):
+        # Слежение само не кончится — останавливаем и ждём последнюю пачку
+        if self.watching:
+            self.worker.stop()
+            self.worker.wait()
+        super().closeEvent(event)
+
     def show_readme(self):
         QMessageBox.information(
             self,
@@ -122,7 +180,7 @@ class MainWindow(QMainWindow):
 
     def set_mode(self, mode):
         self.current_mode = mode
-        self.info_screen.setText(f"Mode selected: {mode}")
+        self.info_screen.setPlainText(f"Mode selected: {mode}")
 
     def select_media(self):
         path = QFileDialog.getExistingDirectory(self, "Select MEDIA Folder")
@@ -137,62 +195,209 @@ class MainWindow(QMainWindow):
             self.btn_temp.setText(f"TEMP: {path}")
 
     def update_info(self, text):
-        current = self.info_screen.text()
-        new = f"{current}\n{text}"
-        # Ограничиваем длину, чтобы не тормозить интерфейс
-        if len(new) > 3000:
-            new = new[-3000:]
-        self.info_screen.setText(new)
+        self.info_screen.appendPlainText(text)
+
+    def update_info_batch(self, lines):
+        # Одна вставка на пачку; лишние строки сверху отрезает setMaximumBlockCount
+        self.info_screen.appendPlainText("\n".join(lines))
 
     def start_scan(self):
+        if self.watching:
+            # Во время слежения START работает как STOP
+            self.worker.stop()
+            self.btn_start.setEnabled(False)
+            self.btn_start.setText("STOPPING...")
+            return
         if not self.current_mode:
             QMessageBox.warning(self, "Error", "Select scan mode!")
             return
         if not self.media_path:
             QMessageBox.warning(self, "Error", "MEDIA folder not selected!")
             return
+        if not self.temp_path and self.current_mode != "index":
+            QMessageBox.warning(self, "Error", "TEMP folder not selected!")
+            return
+
+        dry_run = self.btn_dry_run.isChecked() and self.current_mode != "index"
+        watch = self.btn_watch.isChecked()
+        if watch and (dry_run or self.current_mode == "index"):
+            QMessageBox.warning(self, "Error", "Watch works without Dry Run and not for Verify Index!")
+            return
+        # Пробный прогон: план рядом с TEMP, файлы не перемещаются
+        plan_out = None
+        if dry_run:
+            from core.plan import default_plan_path
+            path, _ = QFileDialog.getSaveFileName(
+                self, "Save Plan", str(default_plan_path(self.temp_path)), "Plan (*.jsonl)"
+            )
+            if not path:
+                return
+            plan_out = Path(path)
+        rules = None
+        if RULES_FILE.exists():
+            from core.rules import load_rules
+            try:
+                rules = load_rules(RULES_FILE)
+            except (OSError, ValueError) as e:
+                QMessageBox.warning(self, "Error", f"Can't load {RULES_FILE.name}: {e}")
+                return
+        try:
+            # Verify Index работает без TEMP — как и в CLI, вместо него MEDIA
+            worker = make_worker(
+                self.current_mode, self.media_path, self.temp_path or self.media_path,
+                streaming=self.btn_streaming.isChecked(), plan_out=plan_out, rules=rules,
+                watch=watch
+            )
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"Can't start: {e}")
+            return
+        if rules:
+            self.update_info(f"📐 Rules: {RULES_FILE}")
+        self.launch(worker)
+        if watch:
+            self.watching = True
+            self.btn_start.setEnabled(True)
+            self.btn_start.setText("STOP WATCHING")
+
+    def run_plan(self):
+        start = ""
+        if self.temp_path:
+            from core.plan import default_plan_path
+            start = str(default_plan_path(self.temp_path))
+        path, _ = QFileDialog.getOpenFileName(self, "Select Plan", start, "Plan (*.jsonl)")
+        if not path:
+            return
+        try:
+            worker = make_worker(None, None, None, plan_in=path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"Can't read plan: {e}")
+            return
+        self.launch(worker)
+
+    def undo_last_run(self):
         if not self.temp_path:
             QMessageBox.warning(self, "Error", "TEMP folder not selected!")
             return
+        from core.undo import latest_undo_log
+        path = latest_undo_log(self.temp_path)
+        if not path:
+            QMessageBox.information(self, "Undo", "Nothing to undo in this TEMP folder.")
+            return
+        answer = QMessageBox.question(
+            self, "Undo", f"Move files back as they were before this run?\n{path.name}"
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        try:
+            worker = make_worker(None, None, None, undo_in=path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"Can't read undo log: {e}")
+            return
+        self.launch(worker)
+
+    def show_results(self):
+        # Таблица на миллион строк: модель читает ledger лениво, порциями
+        from ui.results_view import ResultsDialog
+        ResultsDialog(self.moved, self).exec()
 
+    def launch(self, worker):
         # Блокируем кнопки
         self.btn_start.setEnabled(False)
         self.btn_mode_full.setEnabled(False)
         self.btn_mode_dupes.setEnabled(False)
         self.btn_mode_trash.setEnabled(False)
+        self.btn_mode_index.setEnabled(False)
+        self.btn_mode_similar.setEnabled(False)
+        self.btn_streaming.setEnabled(False)
+        self.btn_watch.setEnabled(False)
+        self.btn_dry_run.setEnabled(False)
+        self.btn_run_plan.setEnabled(False)
+        self.btn_undo.setEnabled(False)
+        self.btn_results.setEnabled(False)
+        # Ledger прошлого запуска больше не покажем — закрываем его временный файл
+        if self.moved is not None:
+            self.moved.close()
+            self.moved = None
         self.btn_start.setText("WORKING...")
+        set_state(self.btn_start, None)
 
         # Запуск воркера
-        self.worker = ScannerWorker(self.current_mode, self.media_path, self.temp_path)
+        self.worker = worker
+        self.progress.setFormat("%p%")
         self.worker.progress.connect(lambda v: self.progress.setAnimatedValue(v))
-        self.worker.message.connect(self.update_info)
+        self.worker.counts.connect(
+            lambda done, found: self.progress.setFormat(f"%p%  ({done} / {found})")
+        )
+        self.worker.messages.connect(self.update_info_batch)
         self.worker.finished.connect(self.scan_finished)
         self.worker.error.connect(self.scan_error)
         self.worker.start()
 
     def scan_finished(self, results):
+        self.watching = False
         self.update_info("=== Finished ===")
         moved = results.get("moved", [])
+        self.moved = moved
         self.update_info(f"✅ Moved: {len(moved)} files")
         self.update_info(f"   Screenshots: {results.get('screenshots', 0)}")
         self.update_info(f"   Compressed: {results.get('compressed', 0)}")
         self.update_info(f"   Other: {results.get('other', 0)}")
         self.update_info(f"   Duplicates: {results.get('duplicates', 0)}")
         self.update_info(f"   Sorted: {results.get('sorted', 0)}")
+        self.update_info(
+            f"   Dates — EXIF: {results.get('exif', 0)}, name: {results.get('name_date', 0)}, "
+            f"system: {results.get('system_date', 0)}"
+        )
+        self.update_info(f"   Stat calls: {results.get('stat_calls', 0)}")
+        if "unchanged" in results:
+            self.update_info(
+                f"   Index: +{results['added']} ~{results['updated']} "
+                f"-{results['removed']} ={results['unchanged']}"
+            )
+        if "similar" in results:
+            self.update_info(f"   Similar photos: {len(results['similar'])}")
+        if "bytes_hashed" in results:
+            self.update_info(f"   Hashed: {results['bytes_hashed'] / 1048576:.1f} MB")
+        if "plan" in results:
+            self.update_info(f"   Plan: {results['plan']} (nothing moved)")
+        if "restored" in results:
+            self.update_info(f"   Restored: {results['restored']}")
+        if "undo" in results:
+            self.update_info(f"   Undo log: {results['undo']}")
+        speed = results.get("throughput", {})
+        self.update_info(
+            f"   Speed: {speed.get('files_per_s', 0):.1f} files/s, {speed.get('mb_per_s', 0):.1f} MB/s"
+        )
 
         # Разблокируем UI
         self.btn_start.setEnabled(True)
         self.btn_mode_full.setEnabled(True)
         self.btn_mode_dupes.setEnabled(True)
         self.btn_mode_trash.setEnabled(True)
+        self.btn_mode_index.setEnabled(True)
+        self.btn_mode_similar.setEnabled(True)
+        self.btn_streaming.setEnabled(True)
+        self.btn_watch.setEnabled(True)
+        self.btn_dry_run.setEnabled(True)
+        self.btn_run_plan.setEnabled(True)
+        self.btn_undo.setEnabled(True)
+        self.btn_results.setEnabled(len(moved) > 0)
         self.btn_start.setText("DONE")
-        self.btn_start.setStyleSheet("QPushButton { background-color: #00FFAA; color: #0b0b0b; font-weight:bold; }")
+        set_state(self.btn_start, "done")
 
     def scan_error(self, err_text):
+        self.watching = False
         self.update_info(f"❌ ERROR: {err_text}")
         self.btn_start.setEnabled(True)
         self.btn_mode_full.setEnabled(True)
         self.btn_mode_dupes.setEnabled(True)
         self.btn_mode_trash.setEnabled(True)
+        self.btn_mode_index.setEnabled(True)
+        self.btn_mode_similar.setEnabled(True)
+        self.btn_streaming.setEnabled(True)
+        self.btn_watch.setEnabled(True)
+        self.btn_dry_run.setEnabled(True)
+        self.btn_run_plan.setEnabled(True)
+        self.btn_undo.setEnabled(True)
         self.btn_start.setText("ERROR")
-        self.btn_start.setStyleSheet("QPushButton { background-color: #FF7675; color: white; font-weight:bold; }")
\ No newline at end of file
+        set_state(self.btn_start, "error")
\ No newline at end of file
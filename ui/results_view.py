@@ -0,0 +1,169 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QLabel, QTableView, QHeaderView,
+    QAbstractItemView
+)
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+# Строк за один fetchMore: вид подгружает следующую порцию, когда докрутили до конца
+FETCH_BATCH = 1000
+ROW_HEIGHT = 24
+# (заголовок, ключ сортировки MoveLedger.order, ширина)
+COLUMNS = (
+    ("File", "name", 260),
+    ("From", "from", 330),
+    ("To", "to", 330),
+    ("Category", "category", 110),
+    ("Size", "size", 90),
+)
+# Фильтры, которые показываем всегда; категории правил добавляются по факту
+CATEGORIES = ("screenshots", "compressed", "duplicates", "sorted", "other")
+
+
+def human_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class MovesModel(QAbstractTableModel):
+    """Таблица перемещений поверх MoveLedger — строки не копируются.
+
+    Модель держит только номера строк ledger в текущем порядке (без
+    фильтра и сортировки — просто range) и сколько из них уже отдано виду.
+    Текст ячейки собирается в data() для тех строк, что на экране.
+    """
+
+    def __init__(self, ledger, parent=None):
+        super().__init__(parent)
+        self.ledger = ledger
+        self.category = None
+        self._sort = None          # (колонка, порядок)
+        self._rows = range(len(ledger))
+        self._loaded = 0
+
+    def _reload(self):
+        self.beginResetModel()
+        rows = self.ledger.select(self.category) if self.category else range(len(self.ledger))
+        if self._sort:
+            column, order = self._sort
+            rows = self.ledger.order(rows, COLUMNS[column][1], order == Qt.DescendingOrder)
+        self._rows = rows
+        self._loaded = 0
+        self.endResetModel()
+
+    def set_category(self, category):
+        """None — все строки"""
+        self.category = category
+        self._reload()
+
+    @property
+    def total(self):
+        return len(self._rows)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH, len(self._rows) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        i = self._rows[index.row()]
+        column = index.column()
+        ledger = self.ledger
+        if role == Qt.DisplayRole:
+            if column == 0:
+                name, new = ledger.name(i), ledger.dst_name(i)
+                return name if name == new else f"{name} → {new}"
+            if column == 1:
+                return ledger.dirs[ledger.src_dir[i]]
+            if column == 2:
+                return ledger.dirs[ledger.dst_dir[i]]
+            if column == 3:
+                return ledger.category_of(i)
+            return human_size(ledger.size[i])
+        if role == Qt.ToolTipRole and column in (1, 2):
+            return str(ledger.src(i) if column == 1 else ledger.dst(i))
+        if role == Qt.TextAlignmentRole and column == 4:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # -1 — исходный порядок перемещений (так вид включает сортировку)
+        self._sort = (column, order) if 0 <= column < len(COLUMNS) else None
+        self._reload()
+
+
+class ResultsDialog(QDialog):
+    """Что куда переместилось: фильтр по категории, сортировка по колонкам"""
+
+    def __init__(self, ledger, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Results — {len(ledger)} moved")
+        self.resize(1200, 650)
+        self.model = MovesModel(ledger, self)
+
+        layout = QVBoxLayout(self)
+        bar = QHBoxLayout()
+        self.filter = QComboBox()
+        counts = ledger.counts()
+        self.filter.addItem(f"All ({len(ledger)})", None)
+        extra = sorted(c for c in counts if c not in CATEGORIES)
+        for category in CATEGORIES + tuple(extra):
+            self.filter.addItem(f"{category} ({counts.get(category, 0)})", category)
+        self.filter.currentIndexChanged.connect(self.apply_filter)
+        bar.addWidget(QLabel("Category:"))
+        bar.addWidget(self.filter)
+        bar.addStretch(1)
+        self.shown = QLabel()
+        bar.addWidget(self.shown)
+        layout.addLayout(bar)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setWordWrap(False)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        # Фиксированная высота строк — виду не нужно измерять каждую строку
+        rows = self.table.verticalHeader()
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(ROW_HEIGHT)
+        rows.hide()
+        self.table.setAlternatingRowColors(True)
+        header = self.table.horizontalHeader()
+        header.setStretchLastSection(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+        # Сброс модели (фильтр, сортировка) сбрасывает и ширины колонок
+        self.model.modelReset.connect(self.update_shown)
+        self.update_shown()
+
+    def apply_filter(self):
+        self.model.set_category(self.filter.currentData())
+
+    def update_shown(self):
+        header = self.table.horizontalHeader()
+        for column, (_title, _key, width) in enumerate(COLUMNS):
+            header.resizeSection(column, width)
+        self.shown.setText(f"{self.model.total} rows")
@@ -1,91 +1,91 @@
-﻿from PySide6.QtWidgets import (
-    QPushButton, QProgressBar, QWidget, QLabel, QGraphicsDropShadowEffect
-)
-from PySide6.QtGui import QColor, QPainter, QPen, Qt as QtGui
-from PySide6.QtCore import QPropertyAnimation, QEasingCurve, QRect, QSize, Qt
-
-class AnimatedButton(QPushButton):
-    def __init__(self, text="", parent=None):
-        super().__init__(text, parent)
-        self.setStyleSheet("""
-
-            QPushButton {
-                background-color: #2C2C2C;
-                border: 2px solid #6C5CE7;
-                border-radius: 14px;
-                padding: 8px 24px;
-                color: white;
-                font-size: 18px;
-            }
-        """)
-        self.shadow = QGraphicsDropShadowEffect(self)
-        self.shadow.setBlurRadius(0)
-        self.shadow.setColor(QColor("#6C5CE7"))
-        self.setGraphicsEffect(self.shadow)
-
-class AnimatedProgressBar(QProgressBar):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setMinimum(0); self.setMaximum(100)
-        self.setStyleSheet("""
-            QProgressBar {
-                background-color: #1E1E1E;
-                border-radius: 12px;
-                height: 24px;
-                color: white;
-            }
-            QProgressBar::chunk {
-                background: qlineargradient(x1:0,y1:0,x2:1,y2:1,stop:0 #6C5CE7,stop:1 #0984E3);
-                border-radius: 12px;
-            }
-        """)
-
-class CircleButton(QPushButton):
-    def __init__(self, number="", parent=None):
-        super().__init__(number, parent)
-        self.setFixedSize(48, 48)
-        self.setStyleSheet("""
-            QPushButton {
-                background-color: #2A2A2A;
-                border-radius: 24px;
-                color: white;
-                font-size: 18px;
-            }
-        """)
-        self.shadow = QGraphicsDropShadowEffect(self)
-        self.shadow.setColor(QColor("#6C5CE7"))
-        self.setGraphicsEffect(self.shadow)
-
-class InfoButton(QPushButton):
-    def __init__(self, parent=None):
-        super().__init__("?", parent)
-        self.setFixedSize(40, 40)
-        self.setStyleSheet("""
-            QPushButton {
-                background-color: #2C2C2C;
-                border-radius: 20px;
-                color: #6C5CE7;
-                font-size: 22px;
-                font-weight: bold;
-            }
-        """)
-        self.shadow = QGraphicsDropShadowEffect(self)
-        self.shadow.setColor(QColor("#6C5CE7"))
-        self.setGraphicsEffect(self.shadow)
-
-class IconCircleButton(QWidget):
-    def __init__(self, icon_char, color, parent=None):
-        super().__init__(parent)
-        self.icon = icon_char
-        self.color = color
-        self.setFixedSize(48, 48)
-        self.shadow = QGraphicsDropShadowEffect(self)
-        self.shadow.setColor(QColor(color))
-        self.setGraphicsEffect(self.shadow)
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setBrush(QColor("#2A2A2A"))
-        painter.drawEllipse(0, 0, self.width(), self.height())
-        painter.setPen(QPen(QColor(self.color)))
+﻿from functools import lru_cache
+from PySide6.QtWidgets import (
+    QPushButton, QProgressBar, QWidget, QLabel, QGraphicsDropShadowEffect
+)
+from PySide6.QtGui import QColor, QPainter, QPen, Qt as QtGui
+from PySide6.QtCore import QPropertyAnimation, QEasingCurve, QRect, QSize, Qt
+
+# Оформление — в assets/style.qss (селекторы по именам классов ниже):
+# одна таблица стилей на приложение вместо setStyleSheet в каждом виджете
+
+@lru_cache(maxsize=None)
+def _color(name):
+    return QColor(name)
+
+class Shadowed:
+    """Тень создаётся не в конструкторе, а после первой отрисовки окна.
+
+    QGraphicsDropShadowEffect рисует виджет через offscreen-буфер — пятнадцать
+    таких эффектов заметно тормозят первое появление окна. install_shadows()
+    вызывает окно, когда уже показалось.
+    """
+    shadow = None
+    shadow_color = "#6C5CE7"
+    shadow_blur = None   # None — радиус по умолчанию
+
+    def add_shadow(self):
+        if self.shadow is not None:
+            return
+        self.shadow = QGraphicsDropShadowEffect(self)
+        if self.shadow_blur is not None:
+            self.shadow.setBlurRadius(self.shadow_blur)
+        self.shadow.setColor(_color(self.shadow_color))
+        self.setGraphicsEffect(self.shadow)
+
+def install_shadows(root):
+    for widget in root.findChildren(QWidget):
+        if isinstance(widget, Shadowed):
+            widget.add_shadow()
+
+def set_state(widget, state):
+    """Состояние для селектора [state="..."] в style.qss — без своей таблицы стилей"""
+    widget.setProperty("state", state or "")
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+
+class AnimatedButton(Shadowed, QPushButton):
+    shadow_blur = 0
+
+    def __init__(self, text="", parent=None):
+        super().__init__(text, parent)
+
+class AnimatedProgressBar(QProgressBar):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimum(0); self.setMaximum(100)
+        self._anim = QPropertyAnimation(self, b"value", self)
+        self._anim.setDuration(250)
+        self._anim.setEasingCurve(QEasingCurve.OutCubic)
+
+    def setAnimatedValue(self, value):
+        if value == self._anim.endValue() and self._anim.state() == QPropertyAnimation.Running:
+            return
+        self._anim.stop()
+        self._anim.setStartValue(self.value())
+        self._anim.setEndValue(value)
+        self._anim.start()
+
+class CircleButton(Shadowed, QPushButton):
+    def __init__(self, number="", parent=None):
+        super().__init__(number, parent)
+        self.setFixedSize(48, 48)
+
+class InfoButton(Shadowed, QPushButton):
+    def __init__(self, parent=None):
+        super().__init__("?", parent)
+        self.setFixedSize(40, 40)
+
+class IconCircleButton(Shadowed, QWidget):
+    def __init__(self, icon_char, color, parent=None):
+        super().__init__(parent)
+        self.icon = icon_char
+        self.color = color
+        self.shadow_color = color
+        self.setFixedSize(48, 48)
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setBrush(_color("#2A2A2A"))
+        painter.drawEllipse(0, 0, self.width(), self.height())
+        painter.setPen(QPen(_color(self.color)))
         painter.drawText(self.rect(), Qt.AlignCenter, self.icon)